@@ -15,6 +15,32 @@ def create_app():
     app.config['REDIS_HOST'] = os.environ.get('REDIS_HOST', 'localhost')
     app.config['REDIS_PORT'] = int(os.environ.get('REDIS_PORT', 6379))
     app.config['REDIS_PASSWORD'] = os.environ.get('REDIS_PASSWORD', None)
+    app.config['REDIS_BATCH_SIZE'] = int(os.environ.get('REDIS_BATCH_SIZE', 500))  # Objetos por HMGET en cargas masivas
+    app.config['REDIS_MAX_CONNECTIONS'] = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))  # Conexiones por proceso
+    app.config['REDIS_POOL_TIMEOUT'] = float(os.environ.get('REDIS_POOL_TIMEOUT', 5))  # Segundos esperando una conexión libre
+    app.config['REDIS_HEALTH_CHECK_INTERVAL'] = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL', 30))  # Segundos
+    app.config['REDIS_INSTRUMENTATION'] = os.environ.get('REDIS_INSTRUMENTATION', 'false').lower() == 'true'  # Server-Timing y detector de N+1
+    app.config['REDIS_N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('REDIS_N_PLUS_ONE_THRESHOLD', 10))  # Repeticiones por petición
+    app.config['SERIALIZER'] = os.environ.get('SERIALIZER', 'binary')  # 'binary' (códec compacto) o 'pickle'
+    app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 1000))  # Usuarios en caché por proceso
+    app.config['USER_CACHE_TTL'] = float(os.environ.get('USER_CACHE_TTL', 60))  # Segundos
+    
+    # Backup configuration (registro de respaldos escrito en segundo plano)
+    app.config['BACKUP_DURABILITY'] = os.environ.get('BACKUP_DURABILITY', 'async')  # 'async' o 'sync' (escribir en la petición)
+    app.config['BACKUP_FLUSH_INTERVAL'] = float(os.environ.get('BACKUP_FLUSH_INTERVAL', 1.0))  # Segundos entre volcados
+    app.config['BACKUP_MAX_PENDING'] = int(os.environ.get('BACKUP_MAX_PENDING', 1000))  # Volcar antes si hay tantos pendientes
+    app.config['BACKUP_FSYNC'] = os.environ.get('BACKUP_FSYNC', 'false').lower() == 'true'
+    app.config['BACKUP_SEGMENT_MAX_BYTES'] = int(os.environ.get('BACKUP_SEGMENT_MAX_BYTES', 8 * 1024 * 1024))
+    app.config['BACKUP_COMPACT_SEGMENTS'] = int(os.environ.get('BACKUP_COMPACT_SEGMENTS', 4))  # Segmentos cerrados antes de compactar
+    
+    # Pagination (listados de proyectos y tareas paginados por cursor)
+    app.config['PAGE_SIZE'] = int(os.environ.get('PAGE_SIZE', 25))  # Filas por página
+    
+    # Password hashing (pool acotado fuera del hilo de la petición)
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')  # Método de Werkzeug con su coste, p. ej. 'scrypt:32768:8:1' o 'pbkdf2:sha256:600000'
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))  # Hashes simultáneos por proceso
+    app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 32))  # Hashes en espera antes de rechazar
+    app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))  # Segundos esperando un hueco
     
     # File upload configuration
     app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
@@ -26,6 +52,30 @@ def create_app():
     # Initialize extensions with app
     login_manager.init_app(app)
     
+    # Pool de conexiones a Redis del proceso
+    from app.redis_pool import init_redis
+    init_redis(app)
+    
+    # Contabilidad de Redis por petición (solo si REDIS_INSTRUMENTATION está activo)
+    from app.redis_metrics import init_redis_metrics
+    init_redis_metrics(app)
+    
+    # Caché de proyectos y tareas eliminados, compartida vía contador de generación
+    from app.tombstones import init_tombstones
+    init_tombstones(app)
+    
+    # Caché de usuarios del user_loader, invalidada vía contador de generación
+    from app.user_cache import init_user_cache
+    init_user_cache(app)
+    
+    # Pool de hash de contraseñas
+    from app.passwords import init_password_hasher
+    init_password_hasher(app)
+    
+    # Registro de respaldos y su cola de escritura diferida
+    from app.backup_journal import init_backup_journal
+    init_backup_journal(app)
+    
     # Configure login
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -44,35 +94,14 @@ def create_app():
     app.register_blueprint(tasks_bp)
     
     # Setup loader for Flask-Login
-    from app.models import User
-    from app.persistence import get_user_by_id
+    from app.persistence import load_session_user
     
     @login_manager.user_loader
     def load_user(user_id):
         try:
-            from flask import current_app
-            current_app.logger.info(f"Intentando cargar usuario con ID: {user_id}")
-            user = get_user_by_id(user_id)
-            if user:
-                current_app.logger.info(f"Usuario cargado correctamente: {user.username}")
-            else:
-                # Si no se pudo cargar, intentar buscar el usuario ignorando errores de sirope
-                from app.persistence import get_sirope
-                s = get_sirope()
-                try:
-                    # Buscar directamente en Redis
-                    users = s._redis.hgetall("User")
-                    for uid, _ in users.items():
-                        try:
-                            current_user = s.load(uid)
-                            if current_user and str(current_user.id) == str(user_id):
-                                current_app.logger.info(f"Usuario encontrado por búsqueda alternativa: {current_user.username}")
-                                return current_user
-                        except:
-                            continue
-                except Exception as e:
-                    current_app.logger.error(f"Error en búsqueda alternativa: {str(e)}")
-                
+            user = load_session_user(user_id)
+            if user is None:
+                from flask import current_app
                 current_app.logger.warning(f"No se encontró usuario con ID: {user_id}")
             return user
         except Exception as e:
@@ -87,6 +116,8 @@ def create_app():
         if 'sirope' in g:
             # No es necesario hacer cleanup explícito con Redis
             g.pop('sirope', None)
+        # Descartar el mapa de identidad de la petición
+        g.pop('identity_map', None)
     
     # Limpieza inicial de la base de datos
     with app.app_context():
@@ -106,4 +137,12 @@ def create_app():
     def internal_server_error(e):
         return render_template('errors/500.html'), 500
     
+    from app.passwords import PasswordHasherBusy
+    
+    @app.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(e):
+        response = app.make_response((render_template('errors/503.html'), 503))
+        response.headers['Retry-After'] = '5'
+        return response
+    
     return app 
\ No newline at end of file
@@ -6,6 +6,7 @@ from app.auth import bp
 from app.auth.forms import LoginForm, RegistrationForm, EditProfileForm
 from app.models import User
 from app.persistence import get_user_by_username, get_user_by_email, save_user, get_user_by_id
+from app.passwords import hash_password, verify_password
 import os
 
 @bp.route('/login', methods=['GET', 'POST'])
@@ -15,9 +16,14 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = get_user_by_username(form.username.data)
-        if user is None or not user.check_password(form.password.data):
+        valid, new_hash = verify_password(user.password_hash, form.password.data) if user else (False, None)
+        if not valid:
             flash('Invalid username or password')
             return redirect(url_for('auth.login'))
+        if new_hash:
+            # Hash con otro método o coste: actualizarlo ahora que se conoce la contraseña
+            user.password_hash = new_hash
+            save_user(user)
         login_user(user, remember=form.remember_me.data)
         next_page = request.args.get('next')
         if not next_page or urlparse(next_page).netloc != '':
@@ -46,8 +52,13 @@ def register():
             return redirect(url_for('auth.register'))
         
         user = User(username=form.username.data, email=form.email.data)
-        user.set_password(form.password.data)
-        save_user(user)
+        user.password_hash = hash_password(form.password.data)
+        try:
+            save_user(user)
+        except ValueError:
+            # Otro registro concurrente ha reservado el username o el email
+            flash('Username or email already registered.')
+            return redirect(url_for('auth.register'))
         flash('Congratulations, you are now a registered user!')
         return redirect(url_for('auth.login'))
     return render_template('auth/register.html', title='Register', form=form)
@@ -58,6 +69,10 @@ def edit_profile():
     form = EditProfileForm()
     if form.validate_on_submit():
         user = get_user_by_id(current_user.id)
+        existing = get_user_by_email(form.email.data)
+        if existing is not None and existing.id != user.id:
+            flash('Email already registered.', 'danger')
+            return redirect(url_for('auth.edit_profile'))
         user.email = form.email.data
         user.company = form.company.data
         # Manejo de foto de perfil
@@ -73,8 +88,13 @@ def edit_profile():
             user.profile_picture = '/static/profile_pics/' + filename
         # Cambio de contraseña
         if form.new_password.data:
-            user.set_password(form.new_password.data)
-        save_user(user)
+            user.password_hash = hash_password(form.new_password.data)
+        try:
+            save_user(user)
+        except ValueError:
+            # Otro usuario ha registrado el email entre la comprobación y el guardado
+            flash('Email already registered.', 'danger')
+            return redirect(url_for('auth.edit_profile'))
         flash('Profile updated successfully!', 'success')
         return redirect(url_for('auth.edit_profile'))
     else:
@@ -0,0 +1,165 @@
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+import redis
+from app.backup_log import BackupLog
+from app.persistence import _BACKUP_LOG_DIR, _RESTORE_CHECKPOINT_KEY
+
+# Cola de escritura diferida para los respaldos de proyectos y tareas.
+# Las peticiones solo encolan los datos; un hilo del proceso los añade en lotes al registro
+# de respaldos (app/backup_log.py), quedándose con la última versión de cada objeto
+# (varias ediciones seguidas = un solo registro).
+
+
+class BackupJournal:
+    """Cola de respaldos pendientes, coalescida por objeto."""
+
+    def __init__(self, log, durability='async', flush_interval=1.0, max_pending=1000,
+                 redis_pool=None, logger=None):
+        self.log = log
+        self.durability = durability
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.redis_pool = redis_pool
+        self.logger = logger
+        # (tipo, id) -> (datos o None para borrar, instante de encolado, ts del cambio)
+        self._pending = OrderedDict()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats = {'enqueued': 0, 'coalesced': 0, 'written': 0, 'deleted': 0, 'errors': 0,
+                       'flushes': 0, 'last_flush_ms': 0.0, 'max_lag_ms': 0.0}
+
+    def save(self, kind, obj_id, data):
+        """Encolar la versión actual del respaldo de un objeto."""
+        self._enqueue(kind, obj_id, data)
+
+    def delete(self, kind, obj_id):
+        """Encolar el borrado del respaldo de un objeto (anula una escritura pendiente)."""
+        self._enqueue(kind, obj_id, None)
+
+    def _enqueue(self, kind, obj_id, data):
+        key = (kind, str(obj_id))
+        # El cambio ya está en Redis: su ts es posterior a la escritura en Redis
+        ts = time.time_ns()
+        with self._cond:
+            previous = self._pending.get(key)
+            # Conservar la posición y el instante de la primera versión sin escribir,
+            # así el primer pendiente es siempre el más antiguo
+            queued_at = previous[1] if previous else time.monotonic()
+            self._pending[key] = (data, queued_at, ts)
+            self._stats['enqueued'] += 1
+            if previous:
+                self._stats['coalesced'] += 1
+            if self.durability != 'sync':
+                self._ensure_thread()
+                if len(self._pending) >= self.max_pending:
+                    self._cond.notify()
+        if self.durability == 'sync':
+            self.flush()
+
+    def _ensure_thread(self):
+        # Tras un fork el hilo del padre no existe en el hijo: arrancar uno por proceso
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='backup-journal', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait(self.flush_interval)
+            try:
+                self.flush()
+                self.log.compact()
+            except Exception as e:
+                self._log('error', f"Error al volcar respaldos pendientes: {str(e)}")
+
+    def flush(self):
+        """Añadir al registro todos los respaldos pendientes."""
+        with self._flush_lock:
+            with self._cond:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, OrderedDict()
+
+            start = time.monotonic()
+            records = [(ts, kind, obj_id, data) for (kind, obj_id), (data, _, ts) in batch.items()]
+            try:
+                self.log.append(records)
+            except Exception as e:
+                # Volver a encolar lo que no se pudo escribir, sin pisar versiones más nuevas
+                with self._cond:
+                    for key, entry in batch.items():
+                        self._pending.setdefault(key, entry)
+                    self._stats['errors'] += 1
+                self._log('error', f"Error al escribir en el registro de respaldos: {str(e)}")
+                return 0
+
+            self._update_checkpoint(max(record[0] for record in records))
+            deleted = sum(1 for record in records if record[3] is None)
+            now = time.monotonic()
+            max_lag = max(now - queued_at for _, queued_at, _ in batch.values())
+            with self._cond:
+                stats = self._stats
+                stats['written'] += len(records) - deleted
+                stats['deleted'] += deleted
+                stats['flushes'] += 1
+                stats['last_flush_ms'] = round((now - start) * 1000, 3)
+                stats['max_lag_ms'] = max(stats['max_lag_ms'], round(max_lag * 1000, 3))
+            return len(records)
+
+    def _update_checkpoint(self, ts):
+        # Todo registro con ts <= este valor ya estaba en Redis cuando se escribió la marca:
+        # si Redis se vacía o vuelve a una copia anterior, la marca retrocede con los datos
+        if self.redis_pool is None:
+            return
+        try:
+            redis.Redis(connection_pool=self.redis_pool).set(_RESTORE_CHECKPOINT_KEY, ts)
+        except Exception as e:
+            self._log('warning', f"No se pudo actualizar la marca de restauración: {str(e)}")
+
+    def shutdown(self):
+        """Volcar lo pendiente y cerrar el segmento activo al terminar el proceso."""
+        self.flush()
+        self.log.close()
+
+    def _log(self, level, message):
+        if self.logger is not None:
+            getattr(self.logger, level)(message)
+
+    def stats(self):
+        """Estado de la cola: pendientes, retraso del más antiguo y totales acumulados."""
+        with self._cond:
+            oldest = next(iter(self._pending.values()), None)
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        stats['durability'] = self.durability
+        stats['lag_ms'] = round((time.monotonic() - oldest[1]) * 1000, 3) if oldest else 0.0
+        stats['log'] = self.log.stats()
+        return stats
+
+
+def init_backup_journal(app):
+    """Crear el registro y la cola de respaldos del proceso a partir de la configuración de la app."""
+    log = BackupLog(
+        os.path.join(app.instance_path, _BACKUP_LOG_DIR),
+        segment_max_bytes=app.config['BACKUP_SEGMENT_MAX_BYTES'],
+        compact_segments=app.config['BACKUP_COMPACT_SEGMENTS'],
+        fsync=app.config['BACKUP_FSYNC'],
+    )
+    journal = BackupJournal(
+        log,
+        durability=app.config['BACKUP_DURABILITY'],
+        flush_interval=app.config['BACKUP_FLUSH_INTERVAL'],
+        max_pending=app.config['BACKUP_MAX_PENDING'],
+        redis_pool=app.extensions.get('redis_pool'),
+        logger=app.logger,
+    )
+    app.extensions['backup_journal'] = journal
+    return journal
@@ -0,0 +1,234 @@
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+
+# Registro de cambios de los respaldos: segmentos de solo-añadir más una instantánea compactada.
+#
+#   snapshot-<ns>.jsonl       estado compactado (solo la versión más reciente de cada objeto)
+#   segment-<ns>-<pid>.open   segmento activo de un proceso
+#   segment-<ns>-<pid>.log    segmento cerrado, pendiente de compactar
+#
+# Cada línea es "<ts> <json>", con ts en nanosegundos desde la época: al leer gana el registro
+# con mayor ts de cada objeto, así que el orden entre segmentos de distintos procesos no importa
+# y las líneas anteriores a un ts dado se pueden saltar sin decodificar el JSON.
+#
+# Los borrados (data null) se conservan también en la instantánea: un segmento abierto de otro
+# proceso, o un lote aún sin escribir, puede contener una versión anterior del mismo objeto,
+# y sin el borrado esa versión volvería a aparecer al leer. Igual que los conjuntos de
+# eliminados de Redis, no se purgan.
+
+_SNAPSHOT_PATTERN = 'snapshot-*.jsonl'
+_SEGMENT_PATTERN = 'segment-*.log'
+_OPEN_SEGMENT_PATTERN = 'segment-*.open'
+
+
+def _encode_record(ts, kind, obj_id, data):
+    payload = json.dumps({'kind': kind, 'id': obj_id, 'data': data}, separators=(',', ':'))
+    return f"{ts} {payload}\n"
+
+
+def _segment_pid(path):
+    try:
+        return int(os.path.basename(path).rsplit('.', 1)[0].rsplit('-', 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class BackupLog:
+    """Segmentos de solo-añadir con compactación periódica en una instantánea."""
+
+    def __init__(self, path, segment_max_bytes=8 * 1024 * 1024, compact_segments=4, fsync=False):
+        self.path = path
+        self.segment_max_bytes = segment_max_bytes
+        self.compact_segments = compact_segments
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file = None
+        self._file_path = None
+        self._pid = None
+        self._stats = {'appended': 0, 'segments_closed': 0, 'compactions': 0, 'last_compaction_ms': 0.0}
+
+    def append(self, records):
+        """Añadir registros (ts, tipo, id, datos o None si se borró) con una sola escritura."""
+        if not records:
+            return
+        chunk = ''.join(_encode_record(*record) for record in records)
+        with self._lock:
+            f = self._active_segment()
+            f.write(chunk)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            self._stats['appended'] += len(records)
+            if f.tell() >= self.segment_max_bytes:
+                self._close_segment()
+
+    def _active_segment(self):
+        # Tras un fork el hijo abre su propio segmento
+        if self._file is None or self._pid != os.getpid():
+            os.makedirs(self.path, exist_ok=True)
+            self._pid = os.getpid()
+            self._file_path = os.path.join(self.path, f"segment-{time.time_ns()}-{self._pid}.open")
+            self._file = open(self._file_path, 'a')
+        return self._file
+
+    def _close_segment(self):
+        self._file.close()
+        os.replace(self._file_path, self._file_path[:-len('.open')] + '.log')
+        self._file = None
+        self._file_path = None
+        self._stats['segments_closed'] += 1
+
+    def close(self):
+        """Cerrar el segmento activo de este proceso para que pueda compactarse."""
+        with self._lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._close_segment()
+
+    def _snapshots(self):
+        return sorted(glob.glob(os.path.join(self.path, _SNAPSHOT_PATTERN)))
+
+    def _segments(self, include_open=True):
+        segments = glob.glob(os.path.join(self.path, _SEGMENT_PATTERN))
+        if include_open:
+            segments += glob.glob(os.path.join(self.path, _OPEN_SEGMENT_PATTERN))
+        return sorted(segments)
+
+    @staticmethod
+    def _apply_file(state, path, min_ts):
+        with open(path, 'r') as f:
+            for line in f:
+                ts, _, payload = line.partition(' ')
+                try:
+                    ts = int(ts)
+                except ValueError:
+                    continue
+                if ts <= min_ts:
+                    continue
+                try:
+                    record = json.loads(payload)
+                except ValueError:
+                    # Línea cortada por una caída a mitad de escritura
+                    continue
+                key = (record['kind'], record['id'])
+                current = state.get(key)
+                if current is None or ts > current[0]:
+                    state[key] = (ts, record['data'])
+
+    def read(self, min_ts=0):
+        """Leer la instantánea y los segmentos en una pasada secuencial.
+
+        Devuelve {(tipo, id): (ts, datos)} con la versión más reciente de cada objeto posterior
+        a `min_ts`; los datos son None si el último cambio fue un borrado.
+        """
+        for _ in range(3):
+            state = {}
+            try:
+                snapshots = self._snapshots()
+                if snapshots:
+                    self._apply_file(state, snapshots[-1], min_ts)
+                for segment in self._segments():
+                    self._apply_file(state, segment, min_ts)
+                return state
+            except FileNotFoundError:
+                # Otra compactación ha sustituido los archivos mientras se leían: volver a empezar
+                continue
+        raise RuntimeError("el registro de respaldos cambió durante la lectura")
+
+    def compact(self, force=False):
+        """Plegar la instantánea y los segmentos cerrados en una instantánea nueva.
+
+        Solo compacta un proceso a la vez (flock) y solo si hay al menos `compact_segments`
+        segmentos cerrados, salvo con `force`. Los borrados se mantienen en la instantánea
+        (ver la cabecera del módulo).
+        """
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, 'compact.lock'), 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+
+            # Los segmentos abiertos de procesos que ya no existen se dan por cerrados
+            for segment in glob.glob(os.path.join(self.path, _OPEN_SEGMENT_PATTERN)):
+                pid = _segment_pid(segment)
+                if pid is not None and pid != os.getpid() and not _pid_alive(pid):
+                    os.replace(segment, segment[:-len('.open')] + '.log')
+
+            segments = self._segments(include_open=False)
+            if not segments or (not force and len(segments) < self.compact_segments):
+                return False
+
+            start = time.perf_counter()
+            snapshots = self._snapshots()
+            state = {}
+            if snapshots:
+                self._apply_file(state, snapshots[-1], 0)
+            for segment in segments:
+                self._apply_file(state, segment, 0)
+
+            snapshot_path = os.path.join(self.path, f"snapshot-{time.time_ns()}.jsonl")
+            tmp_path = f"{snapshot_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                for (kind, obj_id), (ts, data) in state.items():
+                    f.write(_encode_record(ts, kind, obj_id, data))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, snapshot_path)
+
+            # Si el proceso cae aquí, releer segmentos ya plegados es inocuo (gana el mayor ts)
+            for path in snapshots + segments:
+                os.remove(path)
+            with self._lock:
+                self._stats['compactions'] += 1
+                self._stats['last_compaction_ms'] = round((time.perf_counter() - start) * 1000, 3)
+            return True
+
+    def stats(self):
+        """Tamaño del registro en disco y actividad de este proceso."""
+        with self._lock:
+            stats = dict(self._stats)
+        snapshots = self._snapshots()
+        segments = self._segments()
+        stats['segments'] = len(segments)
+        stats['snapshot_bytes'] = os.path.getsize(snapshots[-1]) if snapshots else 0
+        stats['segment_bytes'] = sum(os.path.getsize(path) for path in segments if os.path.exists(path))
+        return stats
+
+
+def import_legacy_backups(log, legacy_dirs):
+    """Importar al registro los respaldos de un archivo por objeto.
+
+    `legacy_dirs` es {tipo: directorio}. Cada archivo entra con su mtime como ts, de modo que
+    cualquier cambio posterior ya registrado prevalece. Devuelve {tipo: archivos importados}.
+    """
+    imported = {}
+    for kind, directory in legacy_dirs.items():
+        records = []
+        if os.path.isdir(directory):
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not (entry.name.endswith('.json') and entry.is_file()):
+                        continue
+                    with open(entry.path, 'r') as f:
+                        data = json.load(f)
+                    if data.get('id') is None:
+                        continue
+                    records.append((entry.stat().st_mtime_ns, kind, data['id'], data))
+        log.append(records)
+        imported[kind] = len(records)
+    log.close()
+    return imported
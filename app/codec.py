@@ -0,0 +1,149 @@
+import marshal
+from datetime import date, datetime, timedelta
+from app.models import User, Project, Task, Comment, Attachment
+
+# Cabecera: b'TF' + versión del códec + etiqueta de tipo.
+# Los blobs pickle (protocolo >= 2) empiezan por b'\x80', así que no hay ambigüedad.
+MAGIC = b'TF'
+CODEC_VERSION = 1
+_MARSHAL_VERSION = 4
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Campos temporales: se guardan como microsegundos desde la época (datetime)
+# o como una tupla (ordinal,) (date)
+_TEMPORAL_FIELDS = {'created_at', 'updated_at', 'due_date', 'uploaded_at'}
+
+# Esquemas por versión del códec: etiqueta de tipo, clase y campos en orden.
+# Para añadir campos, crear una versión nueva y conservar las anteriores para poder leerlas.
+SCHEMAS = {
+    1: {
+        1: (User, ('id', 'username', 'email', 'password_hash', 'role', 'created_at',
+                   'company', 'profile_picture')),
+        2: (Project, ('id', 'title', 'description', 'created_at', 'updated_at', 'owner_id',
+                      'member_ids')),
+        3: (Task, ('id', 'title', 'description', 'status', 'priority', 'created_at',
+                   'updated_at', 'project_id', 'creator_id', 'assignee_id', 'due_date')),
+        4: (Comment, ('id', 'content', 'created_at', 'task_id', 'user_id')),
+        5: (Attachment, ('id', 'filename', 'file_path', 'uploaded_at', 'task_id', 'user_id')),
+    },
+}
+
+_TAGS_BY_CLASS = {cls: (tag, fields) for tag, (cls, fields) in SCHEMAS[CODEC_VERSION].items()}
+
+
+def _slot_setter(cls, name):
+    descriptor = getattr(cls, name, None)
+    if hasattr(descriptor, '__set__'):
+        return descriptor.__set__
+
+    def set_attr(obj, value):
+        try:
+            setattr(obj, name, value)
+        except AttributeError:
+            # Campo de un esquema antiguo sin slot equivalente en la clase actual
+            pass
+    return set_attr
+
+
+# Por versión y etiqueta: clase, setters de sus slots en el orden del esquema y posiciones
+# de los campos temporales. decode() escribe los slots por posición, sin diccionario intermedio.
+_DECODERS = {
+    version: {
+        tag: (cls, tuple(_slot_setter(cls, name) for name in fields),
+              tuple(position for position, name in enumerate(fields) if name in _TEMPORAL_FIELDS))
+        for tag, (cls, fields) in schemas.items()
+    }
+    for version, schemas in SCHEMAS.items()
+}
+
+
+class UnsupportedValue(ValueError):
+    """El objeto contiene valores que el códec no sabe representar."""
+
+
+def _encode_temporal(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            raise UnsupportedValue("datetime con zona horaria")
+        return (value - _EPOCH) // _MICROSECOND
+    if isinstance(value, date):
+        return (value.toordinal(),)
+    raise UnsupportedValue(f"valor temporal no soportado: {type(value).__name__}")
+
+
+def _decode_temporal(value):
+    if value is None:
+        return None
+    if isinstance(value, tuple):
+        return date.fromordinal(value[0])
+    return _EPOCH + _MICROSECOND * value
+
+
+def is_encoded(data):
+    """Indicar si un blob está en el formato binario del códec."""
+    return data[:2] == MAGIC
+
+
+def encode(obj):
+    """Codificar un modelo en el formato binario compacto.
+
+    Los atributos del esquema se guardan por posición, sin nombres; los atributos que
+    no existen en el objeto se marcan en una máscara para no inventarlos al leer, y los
+    atributos fuera del esquema se guardan aparte. Lanza UnsupportedValue si algún
+    valor no es representable.
+    """
+    try:
+        tag, fields = _TAGS_BY_CLASS[type(obj)]
+    except KeyError:
+        raise UnsupportedValue(f"clase sin esquema: {type(obj).__name__}")
+
+    attrs = obj.__getstate__()
+    values = []
+    absent_mask = 0
+    for position, name in enumerate(fields):
+        if name not in attrs:
+            absent_mask |= 1 << position
+            values.append(None)
+            continue
+        value = attrs[name]
+        values.append(_encode_temporal(value) if name in _TEMPORAL_FIELDS else value)
+
+    extras = {name: value for name, value in attrs.items() if name not in fields} or None
+    try:
+        payload = marshal.dumps((tuple(values), absent_mask, extras), _MARSHAL_VERSION)
+    except ValueError as e:
+        raise UnsupportedValue(str(e))
+    return MAGIC + bytes((CODEC_VERSION, tag)) + payload
+
+
+def decode(data):
+    """Decodificar un blob generado por encode(), con cualquier versión de esquema conocida."""
+    if not is_encoded(data):
+        raise ValueError("el blob no tiene la cabecera del códec")
+    version, tag = data[2], data[3]
+    try:
+        cls, setters, temporal_positions = _DECODERS[version][tag]
+    except KeyError:
+        raise ValueError(f"versión {version} o tipo {tag} desconocidos")
+
+    values, absent_mask, extras = marshal.loads(data[4:])
+    if temporal_positions:
+        values = list(values)
+        for position in temporal_positions:
+            if values[position] is not None:
+                values[position] = _decode_temporal(values[position])
+    obj = object.__new__(cls)
+    if absent_mask:
+        for position, (setter, value) in enumerate(zip(setters, values)):
+            if not absent_mask >> position & 1:
+                setter(obj, value)
+    else:
+        for setter, value in zip(setters, values):
+            setter(obj, value)
+    if extras:
+        obj.__setstate__(extras)
+    return obj
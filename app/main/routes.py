@@ -1,27 +1,33 @@
-from flask import render_template, flash, redirect, url_for, request
+from flask import render_template, flash, redirect, url_for, request, abort, jsonify
 from flask_login import current_user, login_required
 from app.main import bp
 from app.models import User, Project, Task
 from app.persistence import (
-    get_projects_by_owner, get_projects_by_member, get_tasks_by_assignee, 
-    count_project_tasks, get_project_by_id
+    get_dashboard, get_redis_pool_stats, get_tombstone_stats, get_backup_journal_stats,
+    get_user_cache_stats
 )
+from app.passwords import get_password_hasher_stats
 
 @bp.route('/')
 @bp.route('/index')
 @login_required
 def index():
-    # Get user's projects
-    owned_projects = get_projects_by_owner(current_user.id)
-    member_projects = get_projects_by_member(current_user.id)
-    
-    # Get user's tasks
-    assigned_tasks = get_tasks_by_assignee(current_user.id)
+    # Owned projects, member projects, assigned tasks and task counts from the
+    # user's materialized dashboard (two Redis round trips)
+    dashboard = get_dashboard(current_user.id)
     
     return render_template('main/index.html',
                          title='Dashboard',
-                         owned_projects=owned_projects,
-                         member_projects=member_projects,
-                         assigned_tasks=assigned_tasks,
-                         count_project_tasks=count_project_tasks,
-                         get_project_by_id=get_project_by_id) 
\ No newline at end of file
+                         **dashboard) 
+
+@bp.route('/admin/redis-stats')
+@login_required
+def redis_stats():
+    if getattr(current_user, 'role', None) != 'admin':
+        abort(403)
+    stats = get_redis_pool_stats()
+    stats['tombstones'] = get_tombstone_stats()
+    stats['backup_journal'] = get_backup_journal_stats()
+    stats['user_cache'] = get_user_cache_stats()
+    stats['password_hasher'] = get_password_hasher_stats()
+    return jsonify(stats)
\ No newline at end of file
@@ -3,7 +3,46 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 import uuid
 
-class User(UserMixin):
+class SlottedModel:
+    """Base de los modelos con __slots__: menos memoria por objeto en cargas masivas.
+    
+    Serializa su estado como un diccionario, igual que los objetos con __dict__,
+    así que los valores guardados antes de usar __slots__ se cargan sin migración.
+    """
+    __slots__ = ()
+    _slot_names_cache = {}
+    
+    @classmethod
+    def _slot_names(cls):
+        names = SlottedModel._slot_names_cache.get(cls)
+        if names is None:
+            names = tuple(name for klass in reversed(cls.__mro__)
+                          for name in getattr(klass, '__slots__', ())
+                          if name not in ('__dict__', '__weakref__'))
+            SlottedModel._slot_names_cache[cls] = names
+        return names
+    
+    def __getstate__(self):
+        state = {name: getattr(self, name) for name in self._slot_names() if hasattr(self, name)}
+        state.update(getattr(self, '__dict__', {}))
+        return state
+    
+    def __setstate__(self, state):
+        # Formato de pickle para objetos con slots: (dict, dict_de_slots)
+        if isinstance(state, tuple):
+            dict_state, slot_state = state
+            state = dict(dict_state or {}, **(slot_state or {}))
+        for name, value in state.items():
+            try:
+                setattr(self, name, value)
+            except AttributeError:
+                # Atributo heredado de versiones antiguas sin slot equivalente
+                pass
+
+class User(SlottedModel, UserMixin):
+    __slots__ = ('id', 'username', 'email', 'password_hash', 'role', 'created_at', 'company',
+                 'profile_picture')
+    
     def __init__(self, username, email, password=None, role='user', company=None, profile_picture=None):
         self.id = str(uuid.uuid4())  # Usar UUID como identificador único
         self.username = username
@@ -23,7 +62,9 @@ class User(UserMixin):
     def get_id(self):
         return str(self.id)
 
-class Project:
+class Project(SlottedModel):
+    __slots__ = ('id', 'title', 'description', 'created_at', 'updated_at', 'owner_id', 'member_ids')
+    
     def __init__(self, title, description, owner_id):
         self.id = str(uuid.uuid4())
         self.title = title
@@ -76,7 +117,10 @@ class Project:
         from app.persistence import get_user_by_id
         return get_user_by_id(self.owner_id)
 
-class Task:
+class Task(SlottedModel):
+    __slots__ = ('id', 'title', 'description', 'status', 'priority', 'created_at', 'updated_at',
+                 'project_id', 'creator_id', 'assignee_id', 'due_date')
+    
     def __init__(self, title, description, project_id, creator_id, status='todo', 
                  priority='medium', assignee_id=None, due_date=None):
         self.id = str(uuid.uuid4())
@@ -109,7 +153,11 @@ class Task:
         from app.persistence import get_user_by_id
         return get_user_by_id(self.assignee_id) if self.assignee_id else None
 
-class Comment:
+class Comment(SlottedModel):
+    # user_name y user_profile_picture los rellena la vista de la tarea al renderizar
+    __slots__ = ('id', 'content', 'created_at', 'task_id', 'user_id', 'user_name',
+                 'user_profile_picture')
+    
     def __init__(self, content, task_id, user_id):
         self.id = str(uuid.uuid4())
         self.content = content
@@ -117,7 +165,9 @@ class Comment:
         self.task_id = task_id
         self.user_id = user_id
 
-class Attachment:
+class Attachment(SlottedModel):
+    __slots__ = ('id', 'filename', 'file_path', 'uploaded_at', 'task_id', 'user_id')
+    
     def __init__(self, filename, file_path, task_id, user_id):
         self.id = str(uuid.uuid4())
         self.filename = filename
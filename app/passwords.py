@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Hash de contraseñas fuera del hilo de la petición.
+# scrypt y pbkdf2 (hashlib) liberan el GIL mientras calculan, así que un pool de pocos hilos
+# limita cuántos núcleos consume una avalancha de logins sin frenar al resto de peticiones.
+# Con `max_pending` hashes ya en espera, una petición más espera como mucho `timeout` segundos
+# a que quede un hueco y después se rechaza (503) en vez de alargar la cola.
+
+
+class PasswordHasherBusy(Exception):
+    """El pool de hash está saturado; la petición debe reintentarse más tarde."""
+
+
+class PasswordHasher:
+    """Pool acotado que calcula y verifica hashes con el método configurado."""
+
+    def __init__(self, method='scrypt', workers=1, max_pending=32, timeout=10.0):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        # Prefijo completo del método (p. ej. "scrypt:32768:8:1"), para detectar hashes antiguos
+        self.policy = generate_password_hash('', method).split('$', 1)[0]
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stats = {'hashed': 0, 'verified': 0, 'rehashed': 0, 'rejected': 0,
+                       'wait_ms_total': 0.0, 'wait_ms_max': 0.0}
+
+    def _pool(self):
+        # Tras un fork los hilos del padre no existen en el hijo: un pool por proceso
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hasher')
+            return self._executor
+
+    def _run(self, fn, *args):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise PasswordHasherBusy()
+        try:
+            result = self._pool().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+        waited = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats['wait_ms_total'] += waited
+            self._stats['wait_ms_max'] = max(self._stats['wait_ms_max'], round(waited, 3))
+        return result
+
+    def needs_rehash(self, password_hash):
+        """Indicar si un hash guardado no sigue el método y coste configurados."""
+        return not password_hash or password_hash.split('$', 1)[0] != self.policy
+
+    def hash(self, password):
+        """Calcular el hash de una contraseña en el pool."""
+        password_hash = self._run(generate_password_hash, password, self.method)
+        with self._lock:
+            self._stats['hashed'] += 1
+        return password_hash
+
+    def _verify(self, password_hash, password):
+        try:
+            valid = check_password_hash(password_hash, password)
+        except ValueError:
+            # Método desconocido en el hash guardado
+            return False, None
+        if valid and self.needs_rehash(password_hash):
+            # Mismo turno del pool: la contraseña en claro solo está disponible ahora
+            return True, generate_password_hash(password, self.method)
+        return valid, None
+
+    def verify(self, password_hash, password):
+        """Verificar una contraseña en el pool.
+
+        Devuelve (válida, hash nuevo o None): si es válida pero el hash guardado usa otro
+        método o coste, el hash nuevo ya viene calculado con la política actual.
+        """
+        if not password_hash:
+            return False, None
+        valid, new_hash = self._run(self._verify, password_hash, password)
+        with self._lock:
+            self._stats['verified'] += 1
+            if new_hash:
+                self._stats['rehashed'] += 1
+        return valid, new_hash
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        calls = stats['hashed'] + stats['verified']
+        stats['wait_ms_avg'] = round(stats.pop('wait_ms_total') / calls, 3) if calls else 0.0
+        stats['policy'] = self.policy
+        stats['workers'] = self.workers
+        stats['max_pending'] = self.max_pending
+        return stats
+
+
+def hash_password(password):
+    """Hash de una contraseña con la política de la app (ver PASSWORD_HASH_*)."""
+    return current_app.extensions['password_hasher'].hash(password)
+
+
+def verify_password(password_hash, password):
+    """Verificar una contraseña; devuelve (válida, hash nuevo si hay que actualizarlo)."""
+    return current_app.extensions['password_hasher'].verify(password_hash, password)
+
+
+def get_password_hasher_stats():
+    """Hashes calculados, rehashes, rechazos y espera del pool de este proceso."""
+    return current_app.extensions['password_hasher'].stats()
+
+
+def init_password_hasher(app):
+    """Crear el pool de hash de contraseñas a partir de la configuración de la app."""
+    hasher = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+    )
+    app.extensions['password_hasher'] = hasher
+    return hasher
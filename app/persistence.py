@@ -1,40 +1,106 @@
 import sirope
 import redis
-import json
 import os
+import json
 import pickle
+from contextlib import contextmanager
 from flask import current_app, g
-from app.models import User, Project, Task, Comment, Attachment
+from app.models import User, Project, Task, Comment
+from app import codec, redis_metrics, tombstones, user_cache
 from datetime import datetime
+import time
+import uuid
 
 # Variables globales para el seguimiento del estado
 _sirope_instance = None
-_deleted_project_ids = set()
-_deleted_task_ids = set()  # Nuevo conjunto para tareas eliminadas
 
-# Directorios para respaldos
+# Directorio del registro de respaldos (segmentos + instantánea, ver app/backup_log.py)
+_BACKUP_LOG_DIR = 'backup_log'
+
+# Directorios de respaldo antiguos (un archivo JSON por objeto), solo para importarlos
 _BACKUP_DIR = 'backup_projects'
 _TASKS_BACKUP_DIR = 'backup_tasks'
 
+# Índices secundarios en Redis
+_USERNAME_INDEX = 'user_username_index'  # username -> id de usuario
+_EMAIL_INDEX = 'user_email_index'  # email -> id de usuario
+_PROJECT_TASKS_KEY = 'project_tasks:{}'  # id de proyecto -> conjunto de ids de tareas
+_ASSIGNEE_TASKS_KEY = 'assignee_tasks:{}'  # id de usuario -> conjunto de ids de tareas asignadas
+_OWNER_PROJECTS_KEY = 'owner_projects:{}'  # id de usuario -> conjunto de ids de proyectos propios
+_MEMBER_PROJECTS_KEY = 'member_projects:{}'  # id de usuario -> conjunto de ids de proyectos como miembro
+_OWNER_PROJECTS_BY_UPDATE_KEY = 'owner_projects_by_update:{}'  # id de usuario -> sorted set de proyectos propios (score: updated_at)
+_MEMBER_PROJECTS_BY_UPDATE_KEY = 'member_projects_by_update:{}'  # id de usuario -> sorted set de proyectos como miembro (score: updated_at)
+_PROJECT_TASKS_BY_UPDATE_KEY = 'project_tasks_by_update:{}'  # id de proyecto -> sorted set de tareas (score: updated_at)
+_TASK_COMMENTS_KEY = 'task_comments:{}'  # id de tarea -> sorted set de ids de comentarios (score: created_at)
+_LEGACY_COMMENT_HASH = 'app.models.Comment'  # Hash donde Sirope guardaba los comentarios en JSON
+_TASK_ATTACHMENTS_KEY = 'task_attachments:{}'  # id de tarea -> conjunto de ids de adjuntos
+_OBJECT_TYPES_KEY = 'object_types'  # id de objeto -> nombre de su clase (hash donde vive)
+_OBJECT_HASHES = ("Project", "Task", "User", "Comment", "Attachment")
+_PROJECT_TASK_COUNTS = 'project_task_counts'  # id de proyecto -> número de tareas
+_PROJECT_MEMBER_COUNTS = 'project_member_counts'  # id de proyecto -> número de miembros
+_PROJECT_VERSIONS = 'project_versions'  # id de proyecto -> versión de sus tareas (sube con cada tarea guardada o borrada)
+_DASHBOARD_KEY = 'dashboard:{}'  # id de usuario -> hash de filas del dashboard (o:/m:<proyecto>, t:<tarea>)
+_RESTORE_CHECKPOINT_KEY = 'restore_checkpoint'  # ts del registro de respaldos hasta el que Redis está al día
+_RESTORE_LOCK_KEY = 'restore_lock'  # Un solo proceso restaura a la vez (todos lo intentan al arrancar)
+_RESTORE_LOCK_TIMEOUT = 600  # Segundos; caduca solo si el proceso que lo tiene muere a medias
+_INDEX_VERSION_KEY = 'index_version'
+_INDEX_VERSION = 10  # Incrementar al añadir índices nuevos para forzar su reconstrucción
+
+# Serialización de objetos: el formato de escritura es configurable (SERIALIZER),
+# la lectura detecta el formato de cada blob, así que los valores pickle antiguos siguen funcionando
+class PickleSerializer:
+    name = 'pickle'
+    
+    @staticmethod
+    def dumps(obj):
+        return pickle.dumps(obj)
+
+class BinarySerializer:
+    name = 'binary'
+    
+    @staticmethod
+    def dumps(obj):
+        try:
+            return codec.encode(obj)
+        except codec.UnsupportedValue as e:
+            current_app.logger.debug(f"Códec binario no aplicable a {type(obj).__name__} ({str(e)}), se usa pickle")
+            return PickleSerializer.dumps(obj)
+
+_SERIALIZERS = {serializer.name: serializer for serializer in (PickleSerializer, BinarySerializer)}
+
+def _dumps(obj):
+    """Serializar un objeto con el serializador configurado."""
+    return _SERIALIZERS[current_app.config.get('SERIALIZER', 'binary')].dumps(obj)
+
+def _loads(data):
+    """Deserializar un blob en formato binario o pickle."""
+    if codec.is_encoded(data):
+        return codec.decode(data)
+    return pickle.loads(data)
+
+def _to_str(value):
+    """Convertir un valor devuelto por Redis a str."""
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
+
 def get_sirope():
-    """Obtener o crear una instancia de Sirope y verificar conexión a Redis."""
+    """Obtener la instancia de Sirope de la petición, sobre el pool de conexiones del proceso."""
     if 'sirope' not in g:
         try:
-            # Inicializar Sirope
-            g.sirope = sirope.Sirope()
-            current_app.logger.info("Sirope inicializado correctamente")
-            
-            # Verificar conexión a Redis
-            redis_client = g.sirope._redis
-            redis_ping = redis_client.ping()
-            current_app.logger.info(f"Conexión a Redis: {redis_ping}")
+            # Reutilizar el pool creado en create_app (sin PING por petición:
+            # el pool comprueba la conexión según REDIS_HEALTH_CHECK_INTERVAL)
+            redis_client = redis_metrics.create_client(current_app.extensions['redis_pool'])
+            g.sirope = sirope.Sirope(redis_client)
             
-            # Cargar lista de elementos eliminados
-            _load_deleted_projects(redis_client)
-            _load_deleted_tasks(redis_client)
-            
-            # Nota: La restauración automática ahora se maneja en __init__.py
-            # para evitar llamadas circulares
+            # Recargar los eliminados y descartar los usuarios modificados solo si otro proceso
+            # los ha cambiado (un round trip por petición con las dos generaciones)
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.get(tombstones.GENERATION_KEY)
+            pipe.get(user_cache.GENERATION_KEY)
+            tombstones_generation, users_generation = pipe.execute()
+            current_app.extensions['tombstones'].refresh(redis_client, tombstones_generation)
+            current_app.extensions['user_cache'].refresh(redis_client, users_generation)
             
         except Exception as e:
             current_app.logger.error(f"ERROR DE CONEXIÓN: {str(e)}")
@@ -42,59 +108,312 @@ def get_sirope():
             
     return g.sirope
 
-def _load_deleted_projects(redis_client):
-    """Cargar IDs de proyectos eliminados."""
-    global _deleted_project_ids
-    try:
-        # Intentar cargar lista de proyectos eliminados de Redis
-        deleted_ids = redis_client.smembers("deleted_projects")
-        if deleted_ids:
-            _deleted_project_ids = {id.decode('utf-8') if isinstance(id, bytes) else id for id in deleted_ids}
-            current_app.logger.info(f"Cargados {len(_deleted_project_ids)} IDs de proyectos eliminados")
-    except Exception as e:
-        current_app.logger.error(f"Error al cargar proyectos eliminados: {str(e)}")
+def get_redis_pool_stats():
+    """Estadísticas del pool de conexiones a Redis de este proceso."""
+    return current_app.extensions['redis_pool'].stats()
+
+def _tombstones():
+    """Caché de eliminados del proceso (ver app/tombstones.py)."""
+    return current_app.extensions['tombstones']
+
+def _user_cache():
+    """Caché de usuarios del proceso (ver app/user_cache.py)."""
+    return current_app.extensions['user_cache']
+
+def get_user_cache_stats():
+    """Aciertos, invalidaciones y tamaño de la caché de usuarios de este proceso."""
+    return _user_cache().stats()
+
+def load_session_user(user_id):
+    """Cargar el usuario de la sesión: de la caché del proceso o, si no está, con un único HMGET."""
+    get_sirope()  # Aplica antes las invalidaciones de otros procesos
+    user = _user_cache().get(user_id)
+    if user is not None:
+        return _identity_map_put("User", user)
+    user = get_users_by_ids([user_id]).get(str(user_id))
+    if user is not None:
+        _user_cache().put(user)
+    return user
+
+def deleted_project_ids():
+    """Ids de proyectos eliminados, según la última generación vista por este proceso."""
+    return _tombstones().projects
+
+def deleted_task_ids():
+    """Ids de tareas eliminadas, según la última generación vista por este proceso."""
+    return _tombstones().tasks
+
+def get_tombstone_stats():
+    """Generación y tamaño de la caché de eliminados de este proceso."""
+    return _tombstones().stats()
+
+def is_project_deleted(project_id):
+    """Indicar si un proyecto está marcado como eliminado."""
+    return str(project_id) in _tombstones().projects
+
+def is_task_deleted(task_id):
+    """Indicar si una tarea está marcada como eliminada."""
+    return str(task_id) in _tombstones().tasks
 
 def _save_deleted_project(project_id):
     """Guardar ID de proyecto eliminado en Redis."""
     try:
-        # Guardar en Redis para persistencia
         s = get_sirope()
-        s._redis.sadd("deleted_projects", str(project_id))
+        _tombstones().add_projects(s._redis, project_id)
         current_app.logger.info(f"Proyecto {project_id} marcado como eliminado")
     except Exception as e:
         current_app.logger.error(f"Error al guardar proyecto eliminado: {str(e)}")
 
-def _load_deleted_tasks(redis_client):
-    """Cargar IDs de tareas eliminadas."""
-    global _deleted_task_ids
+def _forget_deleted_project(project_id):
+    """Quitar un proyecto de la lista de eliminados."""
     try:
-        # Intentar cargar lista de tareas eliminadas de Redis
-        deleted_ids = redis_client.smembers("deleted_tasks")
-        if deleted_ids:
-            _deleted_task_ids = {id.decode('utf-8') if isinstance(id, bytes) else id for id in deleted_ids}
-            current_app.logger.info(f"Cargados {len(_deleted_task_ids)} IDs de tareas eliminadas")
+        s = get_sirope()
+        _tombstones().remove_projects(s._redis, project_id)
     except Exception as e:
-        current_app.logger.error(f"Error al cargar tareas eliminadas: {str(e)}")
+        current_app.logger.error(f"Error al desmarcar proyecto eliminado: {str(e)}")
 
 def _save_deleted_task(task_id):
     """Guardar ID de tarea eliminada en Redis."""
     try:
-        # Guardar en Redis para persistencia
         s = get_sirope()
-        s._redis.sadd("deleted_tasks", str(task_id))
+        _tombstones().add_tasks(s._redis, task_id)
         current_app.logger.info(f"Tarea {task_id} marcada como eliminada")
     except Exception as e:
         current_app.logger.error(f"Error al guardar tarea eliminada: {str(e)}")
 
+def _forget_deleted_task(task_id):
+    """Quitar una tarea de la lista de eliminadas."""
+    try:
+        s = get_sirope()
+        _tombstones().remove_tasks(s._redis, task_id)
+    except Exception as e:
+        current_app.logger.error(f"Error al desmarcar tarea eliminada: {str(e)}")
+
+def _register_type(pipe, obj):
+    """Registrar en el directorio global la clase de un objeto guardado."""
+    pipe.hset(_OBJECT_TYPES_KEY, str(obj.id), obj.__class__.__name__)
+
+# Mapa de identidad por petición: cada objeto se carga y deserializa como mucho una vez
+def _identity_map():
+    """Devolver el mapa de identidad de la petición actual, o None si está desactivado."""
+    if g.get('identity_map_disabled', False):
+        return None
+    if 'identity_map' not in g:
+        g.identity_map = {}
+    return g.identity_map
+
+def _identity_map_get(cls_name, obj_id):
+    identity_map = _identity_map()
+    if identity_map is None:
+        return None
+    return identity_map.get((cls_name, str(obj_id)))
+
+def _identity_map_put(cls_name, obj):
+    identity_map = _identity_map()
+    if identity_map is not None:
+        identity_map[(cls_name, str(obj.id))] = obj
+    return obj
+
+def _identity_map_evict(cls_name, obj_id):
+    if 'identity_map' in g:
+        g.identity_map.pop((cls_name, str(obj_id)), None)
+
+@contextmanager
+def identity_map_disabled():
+    """Leer siempre desde Redis dentro del bloque (p. ej. para verificar una escritura)."""
+    previous = g.get('identity_map_disabled', False)
+    g.identity_map_disabled = True
+    try:
+        yield
+    finally:
+        g.identity_map_disabled = previous
+
+def _load_from_index(hash_name, index_key, excluded_ids=()):
+    """Cargar los objetos de un conjunto de índice con un único HMGET, limpiando ids obsoletos."""
+    s = get_sirope()
+    object_ids = [_to_str(oid) for oid in s._redis.smembers(index_key)]
+    object_ids = [oid for oid in object_ids if oid not in excluded_ids]
+    if not object_ids:
+        return []
+    
+    objects = []
+    stale_ids = []
+    for object_id, serialized in zip(object_ids, s._redis.hmget(hash_name, object_ids)):
+        if not serialized:
+            stale_ids.append(object_id)
+            continue
+        try:
+            objects.append(_loads(serialized))
+        except Exception as e:
+            current_app.logger.warning(f"Error al cargar {hash_name} {object_id}: {str(e)}")
+    
+    if stale_ids:
+        s._redis.srem(index_key, *stale_ids)
+        current_app.logger.info(f"Eliminados {len(stale_ids)} ids obsoletos de {index_key}")
+    return objects
+
+def iter_object_batches(hash_name, excluded_ids=(), batch_size=None):
+    """Recorrer un hash de objetos en lotes de HMGET, devolviendo listas de objetos deserializados.
+    
+    Los ids marcados como eliminados se descartan antes de pedir sus datos, de modo que
+    cargar N objetos cuesta un HKEYS más N/batch_size round trips en lugar de N.
+    """
+    s = get_sirope()
+    batch_size = batch_size or current_app.config.get('REDIS_BATCH_SIZE', 500)
+    object_ids = [_to_str(oid) for oid in s._redis.hkeys(hash_name)]
+    object_ids = [oid for oid in object_ids if oid not in excluded_ids]
+    
+    for start in range(0, len(object_ids), batch_size):
+        chunk = object_ids[start:start + batch_size]
+        batch = []
+        for object_id, serialized in zip(chunk, s._redis.hmget(hash_name, chunk)):
+            if not serialized:
+                continue
+            try:
+                batch.append(_loads(serialized))
+            except Exception as e:
+                current_app.logger.warning(f"Error al cargar {hash_name} {object_id}: {str(e)}")
+        yield batch
+
+# Paginación por cursor sobre los índices ordenados por updated_at
+def _updated_score(obj):
+    """Puntuación de un objeto en los índices ordenados por fecha de modificación."""
+    updated_at = getattr(obj, 'updated_at', None) or getattr(obj, 'created_at', None)
+    return updated_at.timestamp() if updated_at else 0
+
+def _encode_cursor(score, object_id):
+    return f"{score!r}:{object_id}"
+
+def _decode_cursor(cursor):
+    """Separar un cursor 'score:id'; None si falta o está mal formado (se vuelve a la primera página)."""
+    if not cursor:
+        return None
+    score, _, object_id = cursor.partition(':')
+    try:
+        return float(score), object_id
+    except ValueError:
+        return None
+
+def _entries_after_missing_cursor(redis_client, index_key, score, last_id, count):
+    """Las `count` filas siguientes a un cursor cuya fila ya no está en su sitio."""
+    # Primero los empates con id menor que el del cursor, en bloques de `count` filas
+    entries = []
+    offset = 0
+    while len(entries) < count:
+        chunk = redis_client.zrevrangebyscore(index_key, score, score, start=offset, num=count, withscores=True)
+        entries += [(oid, sc) for oid, sc in chunk if _to_str(oid) < last_id]
+        if len(chunk) < count:
+            break
+        offset += len(chunk)
+    if len(entries) < count:
+        entries += redis_client.zrevrangebyscore(index_key, f"({score!r}", '-inf', start=0,
+                                                 num=count - len(entries), withscores=True)
+    return entries[:count]
+
+def _load_page_from_index(hash_name, index_key, excluded_ids=(), cursor=None, page_size=None):
+    """Cargar una página de un índice ordenado, del más reciente al más antiguo.
+    
+    El cursor es la puntuación y el id de la última fila de la página anterior. La página
+    empieza en la posición de esa fila (ZREVRANK), así que cuesta tres round trips (posición,
+    ids y HMGET) de tamaño `page_size` sea cual sea su profundidad. Si esa fila se ha borrado
+    o ha cambiado de puntuación, se recorren en bloques acotados los empates con la puntuación
+    del cursor (Redis los ordena por id) y se sigue por debajo; en ese caso la página cuesta
+    proporcional a los empates con id mayor que el del cursor. Devuelve (objetos, cursor de la
+    página siguiente o None).
+    """
+    s = get_sirope()
+    page_size = page_size or current_app.config.get('PAGE_SIZE', 25)
+    position = _decode_cursor(cursor)
+    
+    if position is None:
+        entries = s._redis.zrevrange(index_key, 0, page_size, withscores=True)
+    else:
+        score, last_id = position
+        rank = s._redis.zrevrank(index_key, last_id)
+        entries = []
+        if rank is not None:
+            entries = s._redis.zrevrange(index_key, rank, rank + page_size + 1, withscores=True)
+        if entries and _to_str(entries[0][0]) == last_id and entries[0][1] == score:
+            entries = entries[1:]
+        else:
+            entries = _entries_after_missing_cursor(s._redis, index_key, score, last_id, page_size + 1)
+    entries = [(_to_str(oid), sc) for oid, sc in entries]
+    
+    next_cursor = None
+    if len(entries) > page_size:
+        entries = entries[:page_size]
+        next_cursor = _encode_cursor(entries[-1][1], entries[-1][0])
+    
+    object_ids = [oid for oid, _ in entries if oid not in excluded_ids]
+    if not object_ids:
+        return [], next_cursor
+    
+    objects = []
+    stale_ids = []
+    for object_id, serialized in zip(object_ids, s._redis.hmget(hash_name, object_ids)):
+        if not serialized:
+            stale_ids.append(object_id)
+            continue
+        try:
+            objects.append(_loads(serialized))
+        except Exception as e:
+            current_app.logger.warning(f"Error al cargar {hash_name} {object_id}: {str(e)}")
+    
+    if stale_ids:
+        s._redis.zrem(index_key, *stale_ids)
+        current_app.logger.info(f"Eliminados {len(stale_ids)} ids obsoletos de {index_key}")
+    return objects, next_cursor
+
 # Funciones de persistencia para usuarios
+def _claim_unique(redis_client, index_key, value, user_id):
+    """Reservar un valor único en un índice. Devuelve True si se ha reservado ahora."""
+    if redis_client.hsetnx(index_key, value, user_id):
+        return True
+    owner_id = _to_str(redis_client.hget(index_key, value))
+    if owner_id != user_id:
+        raise ValueError(f"El valor '{value}' ya está en uso por otro usuario")
+    return False
+
 def save_user(user):
-    """Guardar un usuario en la base de datos."""
+    """Guardar un usuario en la base de datos y mantener sus índices únicos."""
     try:
         s = get_sirope()
+        user_id = str(user.id)
         
-        # Guardar directamente en Redis usando pickle
-        serialized = pickle.dumps(user)
-        s._redis.hset("User", str(user.id), serialized)
+        # Reservar username y email (HSETNX evita duplicados entre registros concurrentes)
+        claimed = []
+        try:
+            if _claim_unique(s._redis, _USERNAME_INDEX, user.username, user_id):
+                claimed.append((_USERNAME_INDEX, user.username))
+            if _claim_unique(s._redis, _EMAIL_INDEX, user.email, user_id):
+                claimed.append((_EMAIL_INDEX, user.email))
+            
+            # Liberar los valores antiguos si han cambiado
+            previous = s._redis.hget("User", user_id)
+            
+            pipe = s._redis.pipeline()
+            if previous:
+                try:
+                    old_user = _loads(previous)
+                    if getattr(old_user, 'username', None) not in (None, user.username):
+                        pipe.hdel(_USERNAME_INDEX, old_user.username)
+                    if getattr(old_user, 'email', None) not in (None, user.email):
+                        pipe.hdel(_EMAIL_INDEX, old_user.email)
+                except Exception as e:
+                    current_app.logger.warning(f"No se pudo leer la versión anterior del usuario {user_id}: {str(e)}")
+            
+            # Guardar directamente en Redis con el serializador configurado
+            pipe.hset("User", user_id, _dumps(user))
+            _register_type(pipe, user)
+            _user_cache().queue_invalidate(pipe, user_id)
+            generation = pipe.execute()[-1]
+        except Exception:
+            # Sin usuario guardado, las reservas hechas en esta llamada no deben quedar ocupadas
+            for index_key, value in claimed:
+                s._redis.hdel(index_key, value)
+            raise
+        _user_cache().applied(user_id, generation)
+        _identity_map_evict("User", user_id)
         current_app.logger.info(f"Usuario guardado directamente en Redis: {user.id}")
         
         return user.id
@@ -105,41 +424,38 @@ def save_user(user):
         raise
 
 def load_object(oid):
-    """Cargar un objeto por su OID, manejando diferentes formatos de ID de manera silenciosa."""
+    """Cargar un objeto por su ID resolviendo su clase en el directorio global de tipos."""
     s = get_sirope()
     try:
-        # Intentar cargar directamente desde Redis
-        obj_id_str = str(oid)
+        # Los OID de Sirope se cargan con Sirope directamente
+        if isinstance(oid, sirope.OID):
+            return s.load(oid)
         
-        # Intentar con diferentes clases conocidas
-        for cls_name in ["Project", "Task", "User", "Comment", "Attachment"]:
-            try:
-                # Verificar si existe en Redis
-                if s._redis.hexists(cls_name, obj_id_str):
-                    # Obtener el objeto serializado
-                    serialized = s._redis.hget(cls_name, obj_id_str)
-                    if serialized:
-                        # Deserializar el objeto
-                        obj = pickle.loads(serialized)
-                        current_app.logger.debug(f"Objeto {cls_name} cargado desde Redis con ID: {obj_id_str}")
-                        return obj
-            except Exception as e:
-                current_app.logger.debug(f"Error al intentar cargar {cls_name} con ID {obj_id_str}: {str(e)}")
+        obj_id_str = str(oid)
+        cls_name = _to_str(s._redis.hget(_OBJECT_TYPES_KEY, obj_id_str))
+        if cls_name not in _OBJECT_HASHES:
+            # ID desconocido: se descarta con una sola consulta
+            return None
         
-        # Si no se encontró, intentar usar Sirope como fallback
-        try:
-            return s.load(oid)
-        except Exception as sirope_error:
-            current_app.logger.debug(f"Error al cargar mediante Sirope: {str(sirope_error)}")
+        serialized = s._redis.hget(cls_name, obj_id_str)
+        if not serialized:
+            # Entrada obsoleta del directorio
+            s._redis.hdel(_OBJECT_TYPES_KEY, obj_id_str)
+            return None
         
-        # No se encontró el objeto
-        return None
+        obj = _loads(serialized)
+        current_app.logger.debug(f"Objeto {cls_name} cargado desde Redis con ID: {obj_id_str}")
+        return obj
     except Exception as e:
         current_app.logger.error(f"Error general al cargar objeto con ID {oid}: {str(e)}")
         return None
 
 def get_user_by_id(user_id):
     """Obtener un usuario por su ID."""
+    cached = _identity_map_get("User", user_id)
+    if cached is not None:
+        return cached
+    
     s = get_sirope()
     try:
         # Intentar cargar directamente desde Redis
@@ -149,14 +465,14 @@ def get_user_by_id(user_id):
             serialized = s._redis.hget("User", obj_id_str)
             if serialized:
                 # Deserializar el objeto
-                obj = pickle.loads(serialized)
+                obj = _loads(serialized)
                 current_app.logger.debug(f"Usuario cargado desde Redis con ID: {obj_id_str}")
-                return obj
+                return _identity_map_put("User", obj)
             
         # Si no se encontró, intentar fallback a load_object
         obj = load_object(user_id)
         if obj and isinstance(obj, User):
-            return obj
+            return _identity_map_put("User", obj)
         
         # No se encontró el usuario
         current_app.logger.debug(f"No se encontró el usuario con ID: {user_id}")
@@ -167,34 +483,55 @@ def get_user_by_id(user_id):
         current_app.logger.error(traceback.format_exc())
         return None
 
+def get_users_by_ids(user_ids):
+    """Obtener varios usuarios con un único HMGET (ids repetidos o vacíos se ignoran).
+    
+    Devuelve un diccionario {id: usuario} solo con los usuarios encontrados; los que ya
+    están en el mapa de identidad no se vuelven a pedir.
+    """
+    users = {}
+    missing = []
+    for user_id in dict.fromkeys(str(uid) for uid in user_ids if uid):
+        cached = _identity_map_get("User", user_id)
+        if cached is not None:
+            users[user_id] = cached
+        else:
+            missing.append(user_id)
+    if not missing:
+        return users
+    
+    s = get_sirope()
+    for user_id, serialized in zip(missing, s._redis.hmget("User", missing)):
+        if not serialized:
+            current_app.logger.debug(f"No se encontró el usuario con ID: {user_id}")
+            continue
+        try:
+            users[user_id] = _identity_map_put("User", _loads(serialized))
+        except Exception as e:
+            current_app.logger.warning(f"Error al cargar User {user_id}: {str(e)}")
+    return users
+
+def _get_user_by_index(index_key, attr, value):
+    """Resolver un usuario a través de un índice único (HGET + HGET)."""
+    s = get_sirope()
+    user_id = s._redis.hget(index_key, value)
+    if not user_id:
+        return None
+    
+    serialized = s._redis.hget("User", _to_str(user_id))
+    if serialized:
+        user = _loads(serialized)
+        # Protegerse frente a entradas obsoletas del índice
+        if getattr(user, attr, None) == value:
+            return user
+    
+    current_app.logger.warning(f"Entrada obsoleta en {index_key} para '{value}'")
+    return None
+
 def get_user_by_username(username):
     """Obtener un usuario por su nombre de usuario."""
-    s = get_sirope()
     try:
-        # Obtener todas las claves de User en Redis
-        user_keys = s._redis.hkeys("User")
-        
-        # Iterar por cada clave de usuario
-        for user_id_bytes in user_keys:
-            try:
-                # Convertir de bytes a str si es necesario
-                user_id = user_id_bytes
-                if isinstance(user_id_bytes, bytes):
-                    user_id = user_id_bytes.decode('utf-8')
-                
-                # Cargar el usuario
-                serialized = s._redis.hget("User", user_id)
-                if serialized:
-                    user = pickle.loads(serialized)
-                    # Verificar si el username coincide
-                    if hasattr(user, 'username') and user.username == username:
-                        return user
-            except Exception as e:
-                current_app.logger.debug(f"Error al procesar usuario {user_id}: {str(e)}")
-                continue
-        
-        # Si llegamos aquí, no se encontró el usuario
-        return None
+        return _get_user_by_index(_USERNAME_INDEX, 'username', username)
     except Exception as e:
         current_app.logger.error(f"Error al buscar usuario por username: {str(e)}")
         import traceback
@@ -203,32 +540,8 @@ def get_user_by_username(username):
 
 def get_user_by_email(email):
     """Obtener un usuario por su email."""
-    s = get_sirope()
     try:
-        # Obtener todas las claves de User en Redis
-        user_keys = s._redis.hkeys("User")
-        
-        # Iterar por cada clave de usuario
-        for user_id_bytes in user_keys:
-            try:
-                # Convertir de bytes a str si es necesario
-                user_id = user_id_bytes
-                if isinstance(user_id_bytes, bytes):
-                    user_id = user_id_bytes.decode('utf-8')
-                
-                # Cargar el usuario
-                serialized = s._redis.hget("User", user_id)
-                if serialized:
-                    user = pickle.loads(serialized)
-                    # Verificar si el email coincide
-                    if hasattr(user, 'email') and user.email == email:
-                        return user
-            except Exception as e:
-                current_app.logger.debug(f"Error al procesar usuario {user_id}: {str(e)}")
-                continue
-        
-        # Si llegamos aquí, no se encontró el usuario
-        return None
+        return _get_user_by_index(_EMAIL_INDEX, 'email', email)
     except Exception as e:
         current_app.logger.error(f"Error al buscar usuario por email: {str(e)}")
         import traceback
@@ -237,29 +550,10 @@ def get_user_by_email(email):
 
 def get_all_users():
     """Obtener todos los usuarios."""
-    s = get_sirope()
     try:
         users = []
-        # Obtener todas las claves de User en Redis
-        user_keys = s._redis.hkeys("User")
-        
-        # Iterar por cada clave de usuario
-        for user_id_bytes in user_keys:
-            try:
-                # Convertir de bytes a str si es necesario
-                user_id = user_id_bytes
-                if isinstance(user_id_bytes, bytes):
-                    user_id = user_id_bytes.decode('utf-8')
-                
-                # Cargar el usuario
-                serialized = s._redis.hget("User", user_id)
-                if serialized:
-                    user = pickle.loads(serialized)
-                    users.append(user)
-            except Exception as e:
-                current_app.logger.debug(f"Error al procesar usuario {user_id}: {str(e)}")
-                continue
-        
+        for batch in iter_object_batches("User"):
+            users.extend(batch)
         return users
     except Exception as e:
         current_app.logger.error(f"Error al cargar todos los usuarios: {str(e)}")
@@ -267,20 +561,52 @@ def get_all_users():
         current_app.logger.error(traceback.format_exc())
         return []
 
+def _backup_journal():
+    """Cola de escritura diferida de los respaldos del proceso."""
+    return current_app.extensions['backup_journal']
+
+def get_backup_journal_stats():
+    """Pendientes, retraso y totales de la cola de respaldos de este proceso."""
+    return _backup_journal().stats()
+
 # Funciones de persistencia para proyectos
-def _ensure_backup_dir():
-    """Asegurarse de que existe el directorio de respaldo para proyectos."""
-    backup_path = os.path.join(current_app.instance_path, _BACKUP_DIR)
-    if not os.path.exists(backup_path):
-        os.makedirs(backup_path)
-    return backup_path
-
-def _ensure_tasks_backup_dir():
-    """Asegurarse de que existe el directorio de respaldo para tareas."""
-    backup_path = os.path.join(current_app.instance_path, _TASKS_BACKUP_DIR)
-    if not os.path.exists(backup_path):
-        os.makedirs(backup_path)
-    return backup_path
+def _load_previous_project(redis_client, project_id):
+    """Cargar la versión guardada de un proyecto, o None si no existe o es ilegible."""
+    serialized = redis_client.hget("Project", str(project_id))
+    if not serialized:
+        return None
+    try:
+        return _loads(serialized)
+    except Exception as e:
+        current_app.logger.warning(f"No se pudo leer la versión anterior del proyecto {project_id}: {str(e)}")
+        return None
+
+def _add_project_to_indexes(pipe, project):
+    """Añadir un proyecto a los índices de propietario y miembros y al dashboard de cada uno."""
+    row = _dashboard_project_row(project)
+    score = {str(project.id): _updated_score(project)}
+    if getattr(project, 'owner_id', None):
+        pipe.sadd(_OWNER_PROJECTS_KEY.format(project.owner_id), str(project.id))
+        pipe.zadd(_OWNER_PROJECTS_BY_UPDATE_KEY.format(project.owner_id), score)
+        pipe.hset(_DASHBOARD_KEY.format(project.owner_id), f"o:{project.id}", row)
+    for member_id in getattr(project, 'member_ids', []):
+        pipe.sadd(_MEMBER_PROJECTS_KEY.format(member_id), str(project.id))
+        pipe.zadd(_MEMBER_PROJECTS_BY_UPDATE_KEY.format(member_id), score)
+        pipe.hset(_DASHBOARD_KEY.format(member_id), f"m:{project.id}", row)
+
+def _remove_project_from_indexes(pipe, project, keep=None):
+    """Quitar un proyecto de sus índices, salvo de las entradas que siguen valiendo para `keep`."""
+    owner_id = getattr(project, 'owner_id', None)
+    if owner_id and (keep is None or owner_id != getattr(keep, 'owner_id', None)):
+        pipe.srem(_OWNER_PROJECTS_KEY.format(owner_id), str(project.id))
+        pipe.zrem(_OWNER_PROJECTS_BY_UPDATE_KEY.format(owner_id), str(project.id))
+        pipe.hdel(_DASHBOARD_KEY.format(owner_id), f"o:{project.id}")
+    current_members = set(getattr(keep, 'member_ids', [])) if keep is not None else set()
+    for member_id in getattr(project, 'member_ids', []):
+        if member_id not in current_members:
+            pipe.srem(_MEMBER_PROJECTS_KEY.format(member_id), str(project.id))
+            pipe.zrem(_MEMBER_PROJECTS_BY_UPDATE_KEY.format(member_id), str(project.id))
+            pipe.hdel(_DASHBOARD_KEY.format(member_id), f"m:{project.id}")
 
 def save_project(project):
     """Guardar un proyecto tanto en Redis como en archivo JSON de respaldo."""
@@ -288,15 +614,27 @@ def save_project(project):
     try:
         current_app.logger.info(f"=== GUARDANDO PROYECTO: {project.id} - {project.title} ===")
         
-        # 1. GUARDAR EN REDIS
-        serialized = pickle.dumps(project)
-        s._redis.hset("Project", str(project.id), serialized)
-        current_app.logger.info(f"Proyecto guardado en Redis: {project.id}")
+        # Versión anterior, necesaria para actualizar los índices de miembros
+        previous = _load_previous_project(s._redis, project.id)
+        project.updated_at = datetime.utcnow()
         
-        # 2. GUARDAR BACKUP EN JSON
-        backup_path = _ensure_backup_dir()
-        project_file = os.path.join(backup_path, f"{project.id}.json")
+        # 1. GUARDAR EN REDIS (objeto e índices en una sola transacción)
+        serialized = _dumps(project)
+        pipe = s._redis.pipeline()
+        pipe.hset("Project", str(project.id), serialized)
+        _register_type(pipe, project)
+        if previous is not None:
+            _remove_project_from_indexes(pipe, previous, keep=project)
+        _add_project_to_indexes(pipe, project)
+        if previous is not None and previous.title != project.title:
+            # El título aparece también en las filas de tareas asignadas del dashboard
+            _queue_dashboard_project_title(pipe, project)
+        pipe.hset(_PROJECT_MEMBER_COUNTS, str(project.id), len(getattr(project, 'member_ids', [])))
+        pipe.execute()
+        _identity_map_evict("Project", project.id)
+        current_app.logger.info(f"Proyecto guardado en Redis: {project.id}")
         
+        # 2. ENCOLAR BACKUP (se añade al registro en segundo plano, ver app/backup_journal.py)
         # Datos para el backup JSON
         project_data = {
             'id': project.id,
@@ -304,18 +642,15 @@ def save_project(project):
             'description': project.description,
             'owner_id': project.owner_id,
             'created_at': project.created_at.isoformat() if hasattr(project, 'created_at') else datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat(),
+            'updated_at': project.updated_at.isoformat(),
             'member_ids': project.member_ids if hasattr(project, 'member_ids') else []
         }
         
-        # Guardar en archivo JSON
-        with open(project_file, 'w') as f:
-            json.dump(project_data, f, indent=4)
-        current_app.logger.info(f"Backup JSON guardado: {project_file}")
+        _backup_journal().save('projects', project.id, project_data)
         
         # Eliminar de lista de eliminados si existe
-        if str(project.id) in _deleted_project_ids:
-            _deleted_project_ids.remove(str(project.id))
+        if is_project_deleted(project.id):
+            _forget_deleted_project(project.id)
             
         current_app.logger.info(f"=== PROYECTO GUARDADO EXITOSAMENTE ===")
         return project.id
@@ -326,10 +661,14 @@ def save_project(project):
 def get_project_by_id(project_id):
     """Obtener un proyecto por su ID."""
     # Verificar primero si está en la lista de eliminados
-    if str(project_id) in _deleted_project_ids:
+    if is_project_deleted(project_id):
         current_app.logger.debug(f"El proyecto {project_id} está marcado como eliminado")
         return None
     
+    cached = _identity_map_get("Project", project_id)
+    if cached is not None:
+        return cached
+    
     s = get_sirope()
     try:
         # Intentar cargar directamente desde Redis
@@ -339,14 +678,14 @@ def get_project_by_id(project_id):
             serialized = s._redis.hget("Project", obj_id_str)
             if serialized:
                 # Deserializar el objeto
-                obj = pickle.loads(serialized)
+                obj = _loads(serialized)
                 current_app.logger.debug(f"Proyecto cargado desde Redis con ID: {obj_id_str}")
-                return obj
+                return _identity_map_put("Project", obj)
             
         # Si no se encontró, intentar fallback a load_object
         obj = load_object(project_id)
         if obj and isinstance(obj, Project):
-            return obj
+            return _identity_map_put("Project", obj)
         
         # No se encontró el proyecto
         current_app.logger.debug(f"No se encontró el proyecto con ID: {project_id}")
@@ -360,35 +699,14 @@ def get_project_by_id(project_id):
 # Funciones de diagnóstico para depuración
 def list_all_projects_in_redis():
     """Función para listar todos los proyectos disponibles."""
-    s = get_sirope()
     try:
         current_app.logger.info("=== LISTANDO TODOS LOS PROYECTOS ===")
         
-        # 1. Intentar cargar proyectos de Redis primero
+        # 1. Intentar cargar proyectos de Redis primero, en lotes
         all_projects = []
-        project_ids = s._redis.hkeys("Project")
-        current_app.logger.info(f"Encontrados {len(project_ids)} proyectos en Redis")
-        
-        # Cargar cada proyecto desde Redis
-        for project_id_bytes in project_ids:
-            try:
-                # Convertir ID a string si es necesario
-                project_id = project_id_bytes
-                if isinstance(project_id_bytes, bytes):
-                    project_id = project_id_bytes.decode('utf-8')
-                
-                # Ignorar proyectos eliminados
-                if str(project_id) in _deleted_project_ids:
-                    continue
-                
-                # Obtener datos del proyecto desde Redis
-                serialized = s._redis.hget("Project", project_id)
-                if serialized:
-                    project = pickle.loads(serialized)
-                    all_projects.append(project)
-                    current_app.logger.info(f"Proyecto cargado desde Redis: {project.id} - {project.title}")
-            except Exception as e:
-                current_app.logger.warning(f"Error al cargar proyecto {project_id}: {str(e)}")
+        for batch in iter_object_batches("Project", deleted_project_ids()):
+            all_projects.extend(batch)
+        current_app.logger.info(f"Cargados {len(all_projects)} proyectos desde Redis")
         
         # 2. Si no hay proyectos en Redis, cargar desde respaldos
         if not all_projects:
@@ -397,7 +715,7 @@ def list_all_projects_in_redis():
             # Cargar desde backups JSON
             backup_projects = _load_project_backups()
             for project in backup_projects:
-                if str(project.id) not in _deleted_project_ids:
+                if not is_project_deleted(project.id):
                     all_projects.append(project)
                     current_app.logger.info(f"Proyecto cargado desde backup: {project.id} - {project.title}")
         
@@ -411,34 +729,14 @@ def list_all_projects_in_redis():
         try:
             backup_projects = _load_project_backups()
             current_app.logger.info(f"Recuperados {len(backup_projects)} proyectos desde backups como último recurso")
-            return [p for p in backup_projects if str(p.id) not in _deleted_project_ids]
+            return [p for p in backup_projects if not is_project_deleted(p.id)]
         except:
             return []
 
-# Modificar get_projects_by_owner para utilizar la función de diagnóstico
 def get_projects_by_owner(owner_id):
     """Obtener proyectos por ID del propietario."""
     try:
-        current_app.logger.info(f"Buscando proyectos para el propietario: {owner_id}")
-        
-        # Listar todos los proyectos para diagnóstico
-        all_projects = list_all_projects_in_redis()
-        current_app.logger.info(f"Total de proyectos encontrados en Redis: {len(all_projects)}")
-        
-        # Filtrar por propietario
-        owner_projects = []
-        for project in all_projects:
-            try:
-                project_owner = getattr(project, 'owner_id', None)
-                current_app.logger.debug(f"Proyecto {project.id} tiene propietario {project_owner}")
-                
-                if hasattr(project, 'owner_id') and project.owner_id == owner_id:
-                    owner_projects.append(project)
-                    current_app.logger.info(f"Proyecto coincide: ID={project.id}, Título={project.title}")
-            except Exception as e:
-                current_app.logger.error(f"Error al procesar proyecto en get_projects_by_owner: {str(e)}")
-                continue
-        
+        owner_projects = _load_from_index("Project", _OWNER_PROJECTS_KEY.format(owner_id), deleted_project_ids())
         current_app.logger.info(f"Encontrados {len(owner_projects)} proyectos para el propietario {owner_id}")
         return owner_projects
     except Exception as e:
@@ -447,21 +745,20 @@ def get_projects_by_owner(owner_id):
         current_app.logger.error(traceback.format_exc())
         return []
 
+def get_projects_page_by_owner(owner_id, cursor=None, page_size=None):
+    """Obtener una página de proyectos de un propietario, los modificados más recientemente primero."""
+    return _load_page_from_index("Project", _OWNER_PROJECTS_BY_UPDATE_KEY.format(owner_id),
+                                 deleted_project_ids(), cursor, page_size)
+
+def get_projects_page_by_member(user_id, cursor=None, page_size=None):
+    """Obtener una página de proyectos donde un usuario es miembro, los modificados más recientemente primero."""
+    return _load_page_from_index("Project", _MEMBER_PROJECTS_BY_UPDATE_KEY.format(user_id),
+                                 deleted_project_ids(), cursor, page_size)
+
 def get_projects_by_member(user_id):
     """Obtener proyectos donde un usuario es miembro."""
     try:
-        # Listar todos los proyectos para diagnóstico
-        all_projects = list_all_projects_in_redis()
-        
-        # Filtrar por miembro
-        member_projects = []
-        for project in all_projects:
-            try:
-                if hasattr(project, 'member_ids') and user_id in project.member_ids:
-                    member_projects.append(project)
-            except:
-                continue
-        
+        member_projects = _load_from_index("Project", _MEMBER_PROJECTS_KEY.format(user_id), deleted_project_ids())
         current_app.logger.info(f"Encontrados {len(member_projects)} proyectos donde el usuario {user_id} es miembro")
         return member_projects
     except Exception as e:
@@ -483,11 +780,9 @@ def delete_object_by_id(obj_id, class_type=None):
             
             # Añadir a la lista de eliminados según el tipo
             if class_type == Project:
-                _deleted_project_ids.add(str(obj_id))
                 _save_deleted_project(obj_id)
                 current_app.logger.info(f"Añadido proyecto {obj_id} a la lista de eliminados")
             elif class_type == Task:
-                _deleted_task_ids.add(str(obj_id))
                 _save_deleted_task(obj_id)
                 current_app.logger.info(f"Añadida tarea {obj_id} a la lista de eliminados")
             
@@ -507,8 +802,10 @@ def delete_object_by_id(obj_id, class_type=None):
                     except Exception as e:
                         current_app.logger.warning(f"Error al eliminar índice: {str(e)}")
                 
-                # Eliminar el objeto del hash principal
+                # Eliminar el objeto del hash principal y del directorio de tipos
                 result = s._redis.hdel(class_name, obj_id_str)
+                s._redis.hdel(_OBJECT_TYPES_KEY, obj_id_str)
+                _identity_map_evict(class_name, obj_id_str)
                 
                 # Eliminar también de almacenamiento suelto (por si acaso)
                 s._redis.delete(f"{class_name}_{obj_id_str}")
@@ -525,7 +822,6 @@ def delete_object_by_id(obj_id, class_type=None):
         else:
             # Si no encontramos el objeto, procesarlo según el tipo
             if class_type == Project:
-                _deleted_project_ids.add(str(obj_id))
                 _save_deleted_project(obj_id)
                 current_app.logger.info(f"Añadido proyecto {obj_id} a la lista de eliminados (no encontrado)")
                 
@@ -537,7 +833,6 @@ def delete_object_by_id(obj_id, class_type=None):
                 except:
                     pass
             elif class_type == Task:
-                _deleted_task_ids.add(str(obj_id))
                 _save_deleted_task(obj_id)
                 current_app.logger.info(f"Añadida tarea {obj_id} a la lista de eliminados (no encontrada)")
                 
@@ -557,13 +852,11 @@ def delete_object_by_id(obj_id, class_type=None):
         # Último intento según el tipo
         try:
             if class_type == Project:
-                _deleted_project_ids.add(str(obj_id))
                 _save_deleted_project(obj_id)
                 if s._redis.hexists("Project", str(obj_id)):
                     s._redis.hdel("Project", str(obj_id))
                     return True
             elif class_type == Task:
-                _deleted_task_ids.add(str(obj_id))
                 _save_deleted_task(obj_id)
                 if s._redis.hexists("Task", str(obj_id)):
                     s._redis.hdel("Task", str(obj_id))
@@ -574,46 +867,73 @@ def delete_object_by_id(obj_id, class_type=None):
         return False
 
 def delete_project(project_id):
-    """Eliminar un proyecto y todas sus tareas, comentarios y adjuntos."""
-    # Primero cargamos el proyecto
-    project = get_project_by_id(project_id)
-    if not project:
-        return False
-    
-    # Eliminar todas las tareas relacionadas
-    tasks = get_tasks_by_project(project_id)
-    for task in tasks:
-        delete_task(task.id)
-    
-    # Eliminar el archivo de respaldo si existe
+    """Eliminar un proyecto y todas sus tareas, comentarios y adjuntos en una sola transacción."""
+    return _cascade_delete(project_id=project_id)
+
+# Funciones de persistencia para tareas
+def _load_previous_task(redis_client, task_id):
+    """Cargar la versión guardada de una tarea, o None si no existe o es ilegible."""
+    serialized = redis_client.hget("Task", str(task_id))
+    if not serialized:
+        return None
     try:
-        backup_path = _ensure_backup_dir()
-        backup_file = os.path.join(backup_path, f"{project_id}.json")
-        if os.path.exists(backup_file):
-            os.remove(backup_file)
-            current_app.logger.info(f"Archivo de respaldo eliminado: {backup_file}")
+        return _loads(serialized)
     except Exception as e:
-        current_app.logger.error(f"Error al eliminar archivo de respaldo: {str(e)}")
-    
-    # Finalmente, eliminar el proyecto usando nuestra función segura
-    return delete_object_by_id(project_id, Project)
+        current_app.logger.warning(f"No se pudo leer la versión anterior de la tarea {task_id}: {str(e)}")
+        return None
+
+def _add_task_to_indexes(pipe, task, project_title=None):
+    """Añadir una tarea a sus índices secundarios y al dashboard de su asignado."""
+    if getattr(task, 'project_id', None):
+        pipe.sadd(_PROJECT_TASKS_KEY.format(task.project_id), str(task.id))
+        pipe.zadd(_PROJECT_TASKS_BY_UPDATE_KEY.format(task.project_id), {str(task.id): _updated_score(task)})
+    if getattr(task, 'assignee_id', None):
+        pipe.sadd(_ASSIGNEE_TASKS_KEY.format(task.assignee_id), str(task.id))
+        pipe.hset(_DASHBOARD_KEY.format(task.assignee_id), f"t:{task.id}",
+                  _dashboard_task_row(task, project_title))
+
+def _remove_task_from_indexes(pipe, task, keep=None):
+    """Quitar una tarea de sus índices, salvo de las entradas que siguen valiendo para `keep`."""
+    project_id = getattr(task, 'project_id', None)
+    if project_id and (keep is None or project_id != getattr(keep, 'project_id', None)):
+        pipe.srem(_PROJECT_TASKS_KEY.format(project_id), str(task.id))
+        pipe.zrem(_PROJECT_TASKS_BY_UPDATE_KEY.format(project_id), str(task.id))
+    assignee_id = getattr(task, 'assignee_id', None)
+    if assignee_id and (keep is None or assignee_id != getattr(keep, 'assignee_id', None)):
+        pipe.srem(_ASSIGNEE_TASKS_KEY.format(assignee_id), str(task.id))
+        pipe.hdel(_DASHBOARD_KEY.format(assignee_id), f"t:{task.id}")
 
-# Funciones de persistencia para tareas
 def save_task(task):
     """Guardar una tarea tanto en Redis como en archivo JSON de respaldo."""
     s = get_sirope()
     try:
         current_app.logger.info(f"=== GUARDANDO TAREA: {task.id} - {task.title} ===")
         
-        # 1. GUARDAR EN REDIS
-        serialized = pickle.dumps(task)
-        s._redis.hset("Task", str(task.id), serialized)
-        current_app.logger.info(f"Tarea guardada en Redis: {task.id}")
+        # Versión anterior, necesaria para mover la tarea entre índices
+        previous = _load_previous_task(s._redis, task.id)
+        task.updated_at = datetime.utcnow()
+        project_title = _dashboard_project_title(s._redis, task) if getattr(task, 'assignee_id', None) else None
         
-        # 2. GUARDAR BACKUP EN JSON
-        backup_path = _ensure_tasks_backup_dir()
-        task_file = os.path.join(backup_path, f"{task.id}.json")
+        # 1. GUARDAR EN REDIS (objeto e índices en una sola transacción)
+        serialized = _dumps(task)
+        pipe = s._redis.pipeline()
+        pipe.hset("Task", str(task.id), serialized)
+        _register_type(pipe, task)
+        if previous is not None:
+            _remove_task_from_indexes(pipe, previous, keep=task)
+        _add_task_to_indexes(pipe, task, project_title)
+        previous_project_id = getattr(previous, 'project_id', None)
+        if previous_project_id != task.project_id:
+            if previous_project_id:
+                pipe.hincrby(_PROJECT_TASK_COUNTS, str(previous_project_id), -1)
+                pipe.hincrby(_PROJECT_VERSIONS, str(previous_project_id), 1)
+            pipe.hincrby(_PROJECT_TASK_COUNTS, str(task.project_id), 1)
+        pipe.hincrby(_PROJECT_VERSIONS, str(task.project_id), 1)
+        pipe.execute()
+        _identity_map_evict("Task", task.id)
+        current_app.logger.info(f"Tarea guardada en Redis: {task.id}")
         
+        # 2. ENCOLAR BACKUP (se añade al registro en segundo plano, ver app/backup_journal.py)
         # Datos para el backup JSON
         task_data = {
             'id': task.id,
@@ -625,18 +945,15 @@ def save_task(task):
             'creator_id': task.creator_id,
             'assignee_id': task.assignee_id if hasattr(task, 'assignee_id') else None,
             'created_at': task.created_at.isoformat() if hasattr(task, 'created_at') else datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat(),
+            'updated_at': task.updated_at.isoformat(),
             'due_date': task.due_date.isoformat() if hasattr(task, 'due_date') and task.due_date else None
         }
         
-        # Guardar en archivo JSON
-        with open(task_file, 'w') as f:
-            json.dump(task_data, f, indent=4)
-        current_app.logger.info(f"Backup JSON guardado: {task_file}")
+        _backup_journal().save('tasks', task.id, task_data)
         
         # Eliminar de lista de eliminados si existe
-        if str(task.id) in _deleted_task_ids:
-            _deleted_task_ids.remove(str(task.id))
+        if is_task_deleted(task.id):
+            _forget_deleted_task(task.id)
             
         current_app.logger.info(f"=== TAREA GUARDADA EXITOSAMENTE ===")
         return task.id
@@ -647,10 +964,14 @@ def save_task(task):
 def get_task_by_id(task_id):
     """Obtener una tarea por su ID."""
     # Verificar primero si está en la lista de eliminados
-    if str(task_id) in _deleted_task_ids:
+    if is_task_deleted(task_id):
         current_app.logger.debug(f"La tarea {task_id} está marcada como eliminada")
         return None
     
+    cached = _identity_map_get("Task", task_id)
+    if cached is not None:
+        return cached
+    
     s = get_sirope()
     try:
         # Intentar cargar directamente desde Redis
@@ -660,14 +981,14 @@ def get_task_by_id(task_id):
             serialized = s._redis.hget("Task", obj_id_str)
             if serialized:
                 # Deserializar el objeto
-                obj = pickle.loads(serialized)
+                obj = _loads(serialized)
                 current_app.logger.debug(f"Tarea cargada desde Redis con ID: {obj_id_str}")
-                return obj
+                return _identity_map_put("Task", obj)
             
         # Si no se encontró, intentar fallback a load_object
         obj = load_object(task_id)
         if obj and isinstance(obj, Task):
-            return obj
+            return _identity_map_put("Task", obj)
         
         # No se encontró la tarea
         current_app.logger.debug(f"No se encontró la tarea con ID: {task_id}")
@@ -681,39 +1002,22 @@ def get_task_by_id(task_id):
 def get_tasks_by_project(project_id):
     """Obtener tareas por ID del proyecto."""
     try:
-        # Listar todas las tareas para diagnóstico
-        all_tasks = list_all_tasks_in_redis()
-        
-        # Filtrar por proyecto
-        project_tasks = []
-        for task in all_tasks:
-            try:
-                if hasattr(task, 'project_id') and task.project_id == project_id:
-                    project_tasks.append(task)
-            except:
-                continue
-        
+        project_tasks = _load_from_index("Task", _PROJECT_TASKS_KEY.format(project_id), deleted_task_ids())
         current_app.logger.info(f"Encontradas {len(project_tasks)} tareas para el proyecto {project_id}")
         return project_tasks
     except Exception as e:
         current_app.logger.error(f"Error al cargar tareas por proyecto: {str(e)}")
         return []
 
+def get_tasks_page_by_project(project_id, cursor=None, page_size=None):
+    """Obtener una página de tareas de un proyecto, las modificadas más recientemente primero."""
+    return _load_page_from_index("Task", _PROJECT_TASKS_BY_UPDATE_KEY.format(project_id),
+                                 deleted_task_ids(), cursor, page_size)
+
 def get_tasks_by_assignee(user_id):
     """Obtener tareas asignadas a un usuario."""
     try:
-        # Listar todas las tareas para diagnóstico
-        all_tasks = list_all_tasks_in_redis()
-        
-        # Filtrar por assignee
-        assigned_tasks = []
-        for task in all_tasks:
-            try:
-                if hasattr(task, 'assignee_id') and task.assignee_id == user_id:
-                    assigned_tasks.append(task)
-            except:
-                continue
-        
+        assigned_tasks = _load_from_index("Task", _ASSIGNEE_TASKS_KEY.format(user_id), deleted_task_ids())
         current_app.logger.info(f"Encontradas {len(assigned_tasks)} tareas asignadas al usuario {user_id}")
         return assigned_tasks
     except Exception as e:
@@ -721,116 +1025,238 @@ def get_tasks_by_assignee(user_id):
         return []
 
 def delete_task(task_id):
-    """Eliminar una tarea y todos sus comentarios y adjuntos."""
-    global _deleted_task_ids
-    
-    # Primero cargamos la tarea
-    task = get_task_by_id(task_id)
-    
-    # Marcar como eliminado en el seguimiento
-    _deleted_task_ids.add(str(task_id))
-    _save_deleted_task(task_id)
-    
-    # Eliminar el archivo de respaldo si existe
+    """Eliminar una tarea y todos sus comentarios y adjuntos en una sola transacción."""
+    return _cascade_delete(task_ids=[task_id])
+
+def _loads_or_none(blob):
+    """Deserializar un blob, o None si falta o es ilegible."""
+    if not blob:
+        return None
     try:
-        backup_path = _ensure_tasks_backup_dir()
-        backup_file = os.path.join(backup_path, f"{task_id}.json")
-        if os.path.exists(backup_file):
-            os.remove(backup_file)
-            current_app.logger.info(f"Archivo de respaldo de tarea eliminado: {backup_file}")
-    except Exception as e:
-        current_app.logger.error(f"Error al eliminar archivo de respaldo de tarea: {str(e)}")
-    
-    if not task:
-        current_app.logger.warning(f"No se encontró el objeto con ID {task_id} para eliminar")
-        
-        # Intentar eliminar directamente de Redis si existe
-        try:
-            s = get_sirope()
-            if s._redis.hexists("Task", task_id):
-                s._redis.hdel("Task", task_id)
-                current_app.logger.info(f"Tarea {task_id} eliminada directamente de Redis")
-                return True
-        except Exception as e:
-            current_app.logger.error(f"Error al eliminar tarea directamente de Redis: {str(e)}")
-            
-        return False
-    
-    # Eliminar comentarios
-    comments = get_comments_by_task(task_id)
-    for comment in comments:
-        delete_object_by_id(comment.id, Comment)
+        return _loads(blob)
+    except Exception:
+        return None
+
+def _cascade_delete(project_id=None, task_ids=(), max_retries=5):
+    """Borrar un proyecto (con todas sus tareas) o unas tareas sueltas, con sus comentarios,
+    adjuntos, entradas de índice, contadores y marcas de eliminado, en un único MULTI/EXEC.
     
-    # Eliminar adjuntos
-    attachments = get_attachments_by_task(task_id)
-    for attachment in attachments:
-        delete_object_by_id(attachment.id, Attachment)
+    Las lecturas se agrupan en pipelines bajo WATCH de los índices de hijos: si otro proceso
+    añade una tarea, comentario o adjunto antes del EXEC, la transacción se repite. El número
+    de round trips no depende del número de tareas.
+    """
+    redis_client = get_sirope()._redis
+    project_key = _PROJECT_TASKS_KEY.format(project_id) if project_id is not None else None
     
-    # Finalmente, eliminar la tarea
-    success = delete_object_by_id(task_id, Task)
+    with redis_client.pipeline() as tx:
+        for _ in range(max_retries):
+            try:
+                # 1. Proyecto y lista de tareas
+                if project_key:
+                    tx.watch(project_key)
+                    reads = redis_client.pipeline(transaction=False)
+                    reads.hget("Project", str(project_id))
+                    reads.smembers(project_key)
+                    project_blob, member_task_ids = reads.execute()
+                    if not project_blob:
+                        tx.unwatch()
+                        return False
+                    project = _loads_or_none(project_blob)
+                    ids = sorted(_to_str(tid) for tid in member_task_ids)
+                else:
+                    project = None
+                    ids = [str(tid) for tid in task_ids]
+                
+                # 2. Tareas, comentarios y adjuntos, vigilando los índices de hijos
+                child_keys = [key for tid in ids
+                              for key in (_TASK_COMMENTS_KEY.format(tid), _TASK_ATTACHMENTS_KEY.format(tid))]
+                if child_keys:
+                    tx.watch(*child_keys)
+                reads = redis_client.pipeline(transaction=False)
+                if ids:
+                    reads.hmget("Task", ids)
+                for tid in ids:
+                    reads.zrange(_TASK_COMMENTS_KEY.format(tid), 0, -1)
+                    reads.smembers(_TASK_ATTACHMENTS_KEY.format(tid))
+                results = reads.execute() if ids else [[]]
+                task_blobs = results[0]
+                comment_ids = [_to_str(cid) for members in results[1::2] for cid in members]
+                attachment_ids = [_to_str(aid) for members in results[2::2] for aid in members]
+                tasks = {tid: _loads_or_none(blob) for tid, blob in zip(ids, task_blobs) if blob}
+                
+                # 3. Todos los borrados en una transacción
+                tx.multi()
+                if tasks:
+                    tx.hdel("Task", *tasks)
+                if comment_ids:
+                    tx.hdel("Comment", *comment_ids)
+                if attachment_ids:
+                    tx.hdel("Attachment", *attachment_ids)
+                object_ids = list(tasks) + comment_ids + attachment_ids
+                if project is not None:
+                    object_ids.append(str(project_id))
+                if object_ids:
+                    tx.hdel(_OBJECT_TYPES_KEY, *object_ids)
+                if child_keys:
+                    tx.delete(*child_keys)
+                for tid, task in tasks.items():
+                    if task is None:
+                        continue
+                    if getattr(task, 'assignee_id', None):
+                        tx.srem(_ASSIGNEE_TASKS_KEY.format(task.assignee_id), tid)
+                        tx.hdel(_DASHBOARD_KEY.format(task.assignee_id), f"t:{tid}")
+                    if not project_key and getattr(task, 'project_id', None):
+                        tx.srem(_PROJECT_TASKS_KEY.format(task.project_id), tid)
+                        tx.zrem(_PROJECT_TASKS_BY_UPDATE_KEY.format(task.project_id), tid)
+                        tx.hincrby(_PROJECT_TASK_COUNTS, str(task.project_id), -1)
+                        tx.hincrby(_PROJECT_VERSIONS, str(task.project_id), 1)
+                if project_key:
+                    tx.hdel("Project", str(project_id))
+                    if project is not None:
+                        _remove_project_from_indexes(tx, project)
+                    tx.delete(project_key, _PROJECT_TASKS_BY_UPDATE_KEY.format(project_id))
+                    tx.hdel(_PROJECT_TASK_COUNTS, str(project_id))
+                    tx.hdel(_PROJECT_MEMBER_COUNTS, str(project_id))
+                    tx.hdel(_PROJECT_VERSIONS, str(project_id))
+                deleted_projects = [project_id] if project_key else []
+                _tombstones().queue_add(tx, project_ids=deleted_projects, task_ids=ids)
+                generation = tx.execute()[-1]
+                break
+            except redis.WatchError:
+                current_app.logger.info("Borrado en cascada interrumpido por un cambio concurrente, se repite")
+                continue
+        else:
+            current_app.logger.error(f"No se pudo completar el borrado en cascada tras {max_retries} intentos")
+            return False
     
-    # Intentar eliminar directamente de Redis si existe
-    try:
-        s = get_sirope()
-        if s._redis.hexists("Task", task_id):
-            s._redis.hdel("Task", task_id)
-            success = True
-            current_app.logger.info(f"Tarea {task_id} eliminada directamente de Redis como respaldo")
-    except Exception as e:
-        current_app.logger.error(f"Error al eliminar tarea directamente de Redis: {str(e)}")
+    _tombstones().applied(redis_client, generation,
+                          add={'projects': deleted_projects, 'tasks': ids})
+    for tid in ids:
+        _identity_map_evict("Task", tid)
+        _backup_journal().delete('tasks', tid)
+    if project_key:
+        _identity_map_evict("Project", project_id)
+        _backup_journal().delete('projects', project_id)
     
-    return success
+    current_app.logger.info(
+        f"Borrado en cascada: {len(deleted_projects)} proyectos, {len(tasks)} tareas, "
+        f"{len(comment_ids)} comentarios y {len(attachment_ids)} adjuntos"
+    )
+    return bool(deleted_projects) or bool(tasks)
 
 # Funciones de persistencia para comentarios
+def _comment_score(comment):
+    """Puntuación de un comentario en el índice ordenado de su tarea."""
+    created_at = getattr(comment, 'created_at', None)
+    return created_at.timestamp() if created_at else 0
+
 def save_comment(comment):
-    """Guardar un comentario en la base de datos."""
+    """Guardar un comentario en Redis y añadirlo al índice ordenado de su tarea."""
     s = get_sirope()
-    oid = s.save(comment)
-    return oid
+    try:
+        pipe = s._redis.pipeline()
+        pipe.hset("Comment", str(comment.id), _dumps(comment))
+        _register_type(pipe, comment)
+        pipe.zadd(_TASK_COMMENTS_KEY.format(comment.task_id), {str(comment.id): _comment_score(comment)})
+        pipe.execute()
+        return comment.id
+    except Exception as e:
+        current_app.logger.error(f"Error al guardar comentario: {str(e)}")
+        raise
 
 def get_comments_by_task(task_id):
-    """Obtener comentarios por ID de la tarea."""
+    """Obtener comentarios por ID de la tarea, ordenados por fecha de creación."""
     s = get_sirope()
-    comments = list(s.filter(Comment, lambda c: c.task_id == task_id))
-    # Ordenar comentarios por fecha de creación
-    comments.sort(key=lambda c: c.created_at)
+    index_key = _TASK_COMMENTS_KEY.format(task_id)
+    comment_ids = [_to_str(cid) for cid in s._redis.zrange(index_key, 0, -1)]
+    if not comment_ids:
+        return []
+    
+    comments = []
+    stale_ids = []
+    for comment_id, serialized in zip(comment_ids, s._redis.hmget("Comment", comment_ids)):
+        if not serialized:
+            stale_ids.append(comment_id)
+            continue
+        try:
+            comments.append(_loads(serialized))
+        except Exception as e:
+            current_app.logger.warning(f"Error al cargar comentario {comment_id}: {str(e)}")
+    
+    if stale_ids:
+        s._redis.zrem(index_key, *stale_ids)
     return comments
 
 # Funciones de persistencia para adjuntos
 def save_attachment(attachment):
-    """Guardar un adjunto en la base de datos (Redis)."""
+    """Guardar un adjunto en la base de datos (Redis) y en el índice de su tarea."""
     s = get_sirope()
     try:
-        serialized = pickle.dumps(attachment)
-        s._redis.hset("Attachment", str(attachment.id), serialized)
+        pipe = s._redis.pipeline()
+        pipe.hset("Attachment", str(attachment.id), _dumps(attachment))
+        _register_type(pipe, attachment)
+        pipe.sadd(_TASK_ATTACHMENTS_KEY.format(attachment.task_id), str(attachment.id))
+        pipe.execute()
         return attachment.id
     except Exception as e:
         current_app.logger.error(f"Error al guardar adjunto: {str(e)}")
         return None
 
 def get_attachments_by_task(task_id):
-    """Obtener adjuntos por ID de la tarea (filtrado manual desde Redis)."""
+    """Obtener adjuntos por ID de la tarea a partir de su índice."""
+    try:
+        return _load_from_index("Attachment", _TASK_ATTACHMENTS_KEY.format(task_id))
+    except Exception as e:
+        current_app.logger.error(f"Error al cargar adjuntos por tarea: {str(e)}")
+        return []
+
+def delete_attachment_record(attachment):
+    """Eliminar el registro de un adjunto y su entrada en el índice de la tarea."""
     s = get_sirope()
-    task_id_str = str(task_id)
-    attachments = []
-    for k in s._redis.hkeys('Attachment'):
-        a = pickle.loads(s._redis.hget('Attachment', k))
-        if str(a.task_id) == task_id_str:
-            attachments.append(a)
-    return attachments
+    pipe = s._redis.pipeline()
+    pipe.hdel("Attachment", str(attachment.id))
+    pipe.srem(_TASK_ATTACHMENTS_KEY.format(attachment.task_id), str(attachment.id))
+    pipe.hdel(_OBJECT_TYPES_KEY, str(attachment.id))
+    deleted = pipe.execute()[0]
+    return deleted > 0
 
 # Funciones auxiliares para contar relaciones
 def count_project_tasks(project_id):
-    """Contar cuántas tareas tiene un proyecto."""
-    tasks = get_tasks_by_project(project_id)
-    return len(tasks) if tasks else 0
+    """Contar cuántas tareas tiene un proyecto (contador mantenido en Redis)."""
+    s = get_sirope()
+    return int(s._redis.hget(_PROJECT_TASK_COUNTS, str(project_id)) or 0)
 
 def count_project_members(project_id):
-    """Contar cuántos miembros tiene un proyecto."""
-    project = get_project_by_id(project_id)
-    if project and hasattr(project, 'member_ids'):
-        return len(project.member_ids)
-    return 0
+    """Contar cuántos miembros tiene un proyecto (contador mantenido en Redis)."""
+    s = get_sirope()
+    return int(s._redis.hget(_PROJECT_MEMBER_COUNTS, str(project_id)) or 0)
+
+def get_project_counts(project_ids):
+    """Obtener los contadores de tareas y miembros de varios proyectos en un solo round trip.
+    
+    Devuelve un diccionario {id_proyecto: {'tasks': n, 'members': m}}.
+    """
+    project_ids = [str(pid) for pid in project_ids]
+    if not project_ids:
+        return {}
+    
+    s = get_sirope()
+    pipe = s._redis.pipeline(transaction=False)
+    pipe.hmget(_PROJECT_TASK_COUNTS, project_ids)
+    pipe.hmget(_PROJECT_MEMBER_COUNTS, project_ids)
+    task_counts, member_counts = pipe.execute()
+    return {
+        project_id: {'tasks': int(tasks or 0), 'members': int(members or 0)}
+        for project_id, tasks, members in zip(project_ids, task_counts, member_counts)
+    }
+
+def get_project_version(project_id):
+    """Obtener la versión de las tareas de un proyecto: cambia cada vez que se guarda o borra una.
+    
+    No se reconstruye con los índices, para que una versión ya entregada no vuelva a repetirse.
+    """
+    s = get_sirope()
+    return int(s._redis.hget(_PROJECT_VERSIONS, str(project_id)) or 0)
 
 def get_project_owner(project_id):
     """Obtener el usuario propietario de un proyecto."""
@@ -839,6 +1265,83 @@ def get_project_owner(project_id):
         return get_user_by_id(project.owner_id)
     return None
 
+# Vista materializada del dashboard
+# Cada usuario tiene un hash dashboard:{id} con una fila JSON por proyecto propio (o:<id>), por
+# proyecto como miembro (m:<id>) y por tarea asignada (t:<id>, con el título de su proyecto).
+# Las filas se escriben en el mismo pipeline que los índices de propietario, miembros y asignado,
+# así que el dashboard se lee con un HGETALL más los contadores de tareas.
+def _dashboard_project_row(project):
+    """Fila de un proyecto en el dashboard."""
+    return json.dumps({
+        'id': str(project.id),
+        'title': project.title,
+        'description': project.description or '',
+    }, separators=(',', ':'))
+
+def _dashboard_task_row(task, project_title):
+    """Fila de una tarea asignada en el dashboard."""
+    due_date = getattr(task, 'due_date', None)
+    return json.dumps({
+        'id': str(task.id),
+        'title': task.title,
+        'status': task.status,
+        'priority': task.priority,
+        'due_date': due_date.isoformat() if due_date else None,
+        'project_id': str(task.project_id),
+        'project_title': project_title,
+    }, separators=(',', ':'))
+
+def _dashboard_project_title(redis_client, task):
+    """Título del proyecto de una tarea, del mapa de identidad si ya está cargado."""
+    project = _identity_map_get("Project", task.project_id)
+    if project is None:
+        project = _loads_or_none(redis_client.hget("Project", str(task.project_id)))
+    return getattr(project, 'title', None)
+
+def _queue_dashboard_project_title(pipe, project):
+    """Encolar en `pipe` el título nuevo de un proyecto en las filas de sus tareas asignadas."""
+    for task in _load_from_index("Task", _PROJECT_TASKS_KEY.format(project.id), deleted_task_ids()):
+        if getattr(task, 'assignee_id', None):
+            pipe.hset(_DASHBOARD_KEY.format(task.assignee_id), f"t:{task.id}",
+                      _dashboard_task_row(task, project.title))
+
+def get_dashboard(user_id):
+    """Obtener el dashboard de un usuario en dos round trips: sus filas y los contadores de tareas.
+    
+    Devuelve un diccionario con 'owned_projects', 'member_projects' y 'assigned_tasks' (listas
+    de diccionarios) y 'project_counts' como en get_project_counts.
+    """
+    s = get_sirope()
+    deleted_projects = deleted_project_ids()
+    deleted_tasks = deleted_task_ids()
+    rows = {'o': [], 'm': [], 't': []}
+    for field, row in s._redis.hgetall(_DASHBOARD_KEY.format(user_id)).items():
+        kind, _, object_id = _to_str(field).partition(':')
+        if kind not in rows or object_id in (deleted_tasks if kind == 't' else deleted_projects):
+            continue
+        try:
+            rows[kind].append(json.loads(row))
+        except ValueError:
+            current_app.logger.warning(f"Fila {_to_str(field)} ilegible en el dashboard del usuario {user_id}")
+    
+    for task in rows['t']:
+        task['due_date'] = datetime.fromisoformat(task['due_date']) if task['due_date'] else None
+    for kind in ('o', 'm'):
+        rows[kind].sort(key=lambda project: project['title'].lower())
+    rows['t'].sort(key=lambda task: (task['due_date'] is None, task['due_date'] or datetime.min, task['title'].lower()))
+    
+    project_counts = get_project_counts([project['id'] for project in rows['o'] + rows['m']])
+    current_app.logger.info(
+        f"Dashboard del usuario {user_id}: {len(rows['o'])} proyectos propios, "
+        f"{len(rows['m'])} como miembro y {len(rows['t'])} tareas asignadas"
+    )
+    return {
+        'owned_projects': rows['o'],
+        'member_projects': rows['m'],
+        'assigned_tasks': rows['t'],
+        'project_counts': project_counts,
+    }
+
 # Funciones de mantenimiento y limpieza
 def cleanup_corrupted_projects():
     """Limpia proyectos corruptos o parcialmente eliminados de Redis."""
@@ -861,7 +1364,6 @@ def cleanup_corrupted_projects():
                 except Exception:
                     # Si hay error al cargar, considerarlo corrupto
                     current_app.logger.warning(f"Error al cargar proyecto {project_id}, marcando como eliminado")
-                    _deleted_project_ids.add(str(project_id))
                     _save_deleted_project(project_id)
                     delete_object_by_id(project_id, Project)
                     cleaned += 1
@@ -870,7 +1372,6 @@ def cleanup_corrupted_projects():
                 # Si no tiene atributos básicos, considerarlo corrupto
                 if not project or not hasattr(project, 'id') or not hasattr(project, 'title'):
                     current_app.logger.warning(f"Proyecto {project_id} corrupto, marcando como eliminado")
-                    _deleted_project_ids.add(str(project_id))
                     _save_deleted_project(project_id)
                     delete_object_by_id(project_id, Project)
                     cleaned += 1
@@ -878,7 +1379,6 @@ def cleanup_corrupted_projects():
                 current_app.logger.error(f"Error al procesar proyecto {project_id}: {str(e)}")
                 # Aún así intentamos eliminarlo
                 try:
-                    _deleted_project_ids.add(str(project_id))
                     _save_deleted_project(project_id)
                     s._redis.hdel("Project", project_id)
                     cleaned += 1
@@ -912,7 +1412,6 @@ def cleanup_corrupted_tasks():
                 except Exception:
                     # Si hay error al cargar, considerarla corrupta
                     current_app.logger.warning(f"Error al cargar tarea {task_id}, marcando como eliminada")
-                    _deleted_task_ids.add(str(task_id))
                     _save_deleted_task(task_id)
                     delete_object_by_id(task_id, Task)
                     cleaned += 1
@@ -921,7 +1420,6 @@ def cleanup_corrupted_tasks():
                 # Si no tiene atributos básicos, considerarla corrupta
                 if not task or not hasattr(task, 'id') or not hasattr(task, 'title'):
                     current_app.logger.warning(f"Tarea {task_id} corrupta, marcando como eliminada")
-                    _deleted_task_ids.add(str(task_id))
                     _save_deleted_task(task_id)
                     delete_object_by_id(task_id, Task)
                     cleaned += 1
@@ -929,7 +1427,6 @@ def cleanup_corrupted_tasks():
                 current_app.logger.error(f"Error al procesar tarea {task_id}: {str(e)}")
                 # Aún así intentamos eliminarla
                 try:
-                    _deleted_task_ids.add(str(task_id))
                     _save_deleted_task(task_id)
                     s._redis.hdel("Task", task_id)
                     cleaned += 1
@@ -947,7 +1444,7 @@ def force_delete_marked_projects():
     s = get_sirope()
     try:
         count = 0
-        for project_id in list(_deleted_project_ids):
+        for project_id in list(deleted_project_ids()):
             # Comprobar si aún existe en Redis
             if s._redis.hexists("Project", project_id):
                 # Eliminar físicamente
@@ -966,7 +1463,7 @@ def force_delete_marked_tasks():
     s = get_sirope()
     try:
         count = 0
-        for task_id in list(_deleted_task_ids):
+        for task_id in list(deleted_task_ids()):
             # Comprobar si aún existe en Redis
             if s._redis.hexists("Task", task_id):
                 # Eliminar físicamente
@@ -980,201 +1477,558 @@ def force_delete_marked_tasks():
     except Exception as e:
         current_app.logger.error(f"Error al forzar eliminación de tareas: {str(e)}")
 
+def _project_from_backup(project_data):
+    """Crear un Project a partir de los datos de su archivo de respaldo."""
+    project = Project(
+        title=project_data.get('title', 'Sin título'),
+        description=project_data.get('description', ''),
+        owner_id=project_data.get('owner_id')
+    )
+    
+    # Establecer el ID original
+    project.id = project_data.get('id')
+    
+    # Establecer miembros si existen
+    if 'member_ids' in project_data:
+        project.member_ids = project_data.get('member_ids', [])
+    
+    # Intentar convertir fechas
+    try:
+        if 'created_at' in project_data:
+            project.created_at = datetime.fromisoformat(project_data.get('created_at'))
+        if 'updated_at' in project_data:
+            project.updated_at = datetime.fromisoformat(project_data.get('updated_at'))
+    except:
+        pass
+    
+    return project
+
+def _task_from_backup(task_data):
+    """Crear una Task a partir de los datos de su archivo de respaldo."""
+    task = Task(
+        title=task_data.get('title', 'Sin título'),
+        description=task_data.get('description', ''),
+        status=task_data.get('status', 'todo'),
+        priority=task_data.get('priority', 'medium'),
+        project_id=task_data.get('project_id'),
+        creator_id=task_data.get('creator_id')
+    )
+    
+    # Establecer el ID original
+    task.id = task_data.get('id')
+    
+    # Establecer assignee_id si existe
+    if task_data.get('assignee_id'):
+        task.assignee_id = task_data.get('assignee_id')
+    
+    # Intentar convertir fechas
+    try:
+        if task_data.get('created_at'):
+            task.created_at = datetime.fromisoformat(task_data.get('created_at'))
+        if task_data.get('updated_at'):
+            task.updated_at = datetime.fromisoformat(task_data.get('updated_at'))
+        if task_data.get('due_date'):
+            task.due_date = datetime.fromisoformat(task_data.get('due_date'))
+    except:
+        pass
+    
+    return task
+
+def _read_backup_log(min_ts=0):
+    """Estado del registro de respaldos posterior a `min_ts`: {(tipo, id): (ts, datos)}."""
+    return _backup_journal().log.read(min_ts)
+
+def _objects_from_backup_state(state, kind):
+    """Objetos vivos de un tipo ('projects' o 'tasks') a partir del estado del registro."""
+    objects = []
+    for (entry_kind, obj_id), (ts, data) in state.items():
+        if entry_kind != kind or data is None:
+            continue
+        try:
+            if kind == 'projects':
+                if not is_project_deleted(obj_id):
+                    objects.append(_project_from_backup(data))
+            elif not is_task_deleted(obj_id):
+                objects.append(_task_from_backup(data))
+        except Exception as e:
+            current_app.logger.error(f"Error al leer el respaldo de {kind} {obj_id}: {str(e)}")
+    return objects
+
 def _load_project_backups():
-    """Cargar proyectos desde los archivos de respaldo."""
-    projects = []
+    """Cargar proyectos desde el registro de respaldos."""
     try:
-        backup_path = _ensure_backup_dir()
-        
-        # Listar archivos JSON en el directorio
-        backup_files = os.listdir(backup_path)
-        current_app.logger.info(f"Encontrados {len(backup_files)} archivos de respaldo de proyectos en {backup_path}")
-        
-        for filename in backup_files:
-            if filename.endswith('.json'):
-                try:
-                    file_path = os.path.join(backup_path, filename)
-                    current_app.logger.info(f"Intentando cargar proyecto desde archivo: {file_path}")
-                    
-                    with open(os.path.join(backup_path, filename), 'r') as f:
-                        project_data = json.load(f)
-                        
-                        # Verificar si este proyecto está en la lista de eliminados
-                        project_id = project_data.get('id')
-                        if project_id is None:
-                            current_app.logger.warning(f"Archivo de respaldo {filename} no contiene ID de proyecto válido")
-                            continue
-                            
-                        if str(project_id) in _deleted_project_ids:
-                            current_app.logger.info(f"Proyecto {project_id} está en la lista de eliminados, se omite")
-                            continue
-                        
-                        # Crear objeto Project desde los datos
-                        project = Project(
-                            title=project_data.get('title', 'Sin título'),
-                            description=project_data.get('description', ''),
-                            owner_id=project_data.get('owner_id')
-                        )
-                        
-                        # Establecer el ID original
-                        project.id = project_data.get('id')
-                        
-                        # Establecer miembros si existen
-                        if 'member_ids' in project_data:
-                            project.member_ids = project_data.get('member_ids', [])
-                        
-                        # Intentar convertir fechas
-                        try:
-                            if 'created_at' in project_data:
-                                project.created_at = datetime.fromisoformat(project_data.get('created_at'))
-                            if 'updated_at' in project_data:
-                                project.updated_at = datetime.fromisoformat(project_data.get('updated_at'))
-                        except:
-                            pass
-                        
-                        projects.append(project)
-                        current_app.logger.info(f"Proyecto cargado desde respaldo: ID={project.id}, Título={project.title}")
-                except Exception as e:
-                    current_app.logger.error(f"Error al cargar proyecto de respaldo {filename}: {str(e)}")
-                    import traceback
-                    current_app.logger.error(traceback.format_exc())
-        
+        projects = _objects_from_backup_state(_read_backup_log(), 'projects')
         current_app.logger.info(f"Total de proyectos cargados desde respaldos: {len(projects)}")
+        return projects
     except Exception as e:
         current_app.logger.error(f"Error al cargar proyectos de respaldo: {str(e)}")
-        import traceback
-        current_app.logger.error(traceback.format_exc())
-    
-    return projects
+        return []
 
 def _load_task_backups():
-    """Cargar tareas desde los archivos de respaldo."""
-    tasks = []
+    """Cargar tareas desde el registro de respaldos."""
     try:
-        backup_path = _ensure_tasks_backup_dir()
-        for filename in os.listdir(backup_path):
-            if filename.endswith('.json'):
-                try:
-                    with open(os.path.join(backup_path, filename), 'r') as f:
-                        task_data = json.load(f)
-                        
-                        # Verificar si esta tarea está en la lista de eliminados
-                        if str(task_data.get('id')) in _deleted_task_ids:
-                            continue
-                        
-                        # Crear objeto Task desde los datos
-                        task = Task(
-                            title=task_data.get('title', 'Sin título'),
-                            description=task_data.get('description', ''),
-                            status=task_data.get('status', 'todo'),
-                            priority=task_data.get('priority', 'medium'),
-                            project_id=task_data.get('project_id'),
-                            creator_id=task_data.get('creator_id')
-                        )
-                        
-                        # Establecer el ID original
-                        task.id = task_data.get('id')
-                        
-                        # Establecer assignee_id si existe
-                        if task_data.get('assignee_id'):
-                            task.assignee_id = task_data.get('assignee_id')
-                        
-                        # Intentar convertir fechas
-                        try:
-                            if task_data.get('created_at'):
-                                task.created_at = datetime.fromisoformat(task_data.get('created_at'))
-                            if task_data.get('updated_at'):
-                                task.updated_at = datetime.fromisoformat(task_data.get('updated_at'))
-                            if task_data.get('due_date'):
-                                task.due_date = datetime.fromisoformat(task_data.get('due_date'))
-                        except:
-                            pass
-                        
-                        tasks.append(task)
-                        current_app.logger.info(f"Tarea cargada desde respaldo: ID={task.id}, Título={task.title}")
-                except Exception as e:
-                    current_app.logger.error(f"Error al cargar tarea de respaldo {filename}: {str(e)}")
+        return _objects_from_backup_state(_read_backup_log(), 'tasks')
     except Exception as e:
         current_app.logger.error(f"Error al cargar tareas de respaldo: {str(e)}")
+        return []
+
+# Restauración incremental desde el registro de respaldos
+def _restore_objects(redis_client, objects):
+    """Escribir en Redis un lote de objetos restaurados con sus índices y contadores, en un solo pipeline."""
+    # Versiones actuales en Redis, para mover índices y contadores como en save_project/save_task
+    # y títulos de los proyectos de las tareas asignadas que no vienen en el lote, para el dashboard
+    titles = {str(obj.id): obj.title for obj in objects if isinstance(obj, Project)}
+    missing_titles = sorted({str(obj.project_id) for obj in objects
+                             if isinstance(obj, Task) and getattr(obj, 'assignee_id', None)} - set(titles))
+    pipe = redis_client.pipeline(transaction=False)
+    for obj in objects:
+        pipe.hget(obj.__class__.__name__, str(obj.id))
+    if missing_titles:
+        pipe.hmget("Project", missing_titles)
+    results = pipe.execute()
+    previous_blobs = results[:len(objects)]
+    if missing_titles:
+        for project_id, blob in zip(missing_titles, results[-1]):
+            titles[project_id] = getattr(_loads_or_none(blob), 'title', None)
+
+    pipe = redis_client.pipeline()
+    for obj, blob in zip(objects, previous_blobs):
+        previous = None
+        if blob:
+            try:
+                previous = _loads(blob)
+            except Exception:
+                previous = None
+
+        pipe.hset(obj.__class__.__name__, str(obj.id), _dumps(obj))
+        _register_type(pipe, obj)
+        if isinstance(obj, Project):
+            if previous is not None:
+                _remove_project_from_indexes(pipe, previous, keep=obj)
+            _add_project_to_indexes(pipe, obj)
+            pipe.hset(_PROJECT_MEMBER_COUNTS, str(obj.id), len(getattr(obj, 'member_ids', [])))
+        else:
+            if previous is not None:
+                _remove_task_from_indexes(pipe, previous, keep=obj)
+            _add_task_to_indexes(pipe, obj, titles.get(str(obj.project_id)))
+            previous_project_id = getattr(previous, 'project_id', None)
+            if previous_project_id != obj.project_id:
+                if previous_project_id:
+                    pipe.hincrby(_PROJECT_TASK_COUNTS, str(previous_project_id), -1)
+                    pipe.hincrby(_PROJECT_VERSIONS, str(previous_project_id), 1)
+                pipe.hincrby(_PROJECT_TASK_COUNTS, str(obj.project_id), 1)
+            pipe.hincrby(_PROJECT_VERSIONS, str(obj.project_id), 1)
+    pipe.execute()
+
+@contextmanager
+def _restore_lock(redis_client):
+    """Cerrojo entre procesos para restore_backups (SET NX con un token propio)."""
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + _RESTORE_LOCK_TIMEOUT
+    while not redis_client.set(_RESTORE_LOCK_KEY, token, nx=True, ex=_RESTORE_LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            raise TimeoutError("No se pudo obtener el cerrojo de restauración")
+        time.sleep(0.05)
+    try:
+        yield
+    finally:
+        # Liberar solo si sigue siendo nuestro (puede haber caducado y tenerlo otro proceso)
+        with redis_client.pipeline() as pipe:
+            try:
+                pipe.watch(_RESTORE_LOCK_KEY)
+                if _to_str(pipe.get(_RESTORE_LOCK_KEY)) == token:
+                    pipe.multi()
+                    pipe.delete(_RESTORE_LOCK_KEY)
+                    pipe.execute()
+            except redis.WatchError:
+                pass
+
+def restore_backups():
+    """Restaurar en Redis los cambios del registro de respaldos que Redis aún no tiene.
+
+    Redis guarda el ts hasta el que está al día (restore_checkpoint); si se vacía o vuelve a una
+    copia anterior, la marca lo hace con él. El registro se lee en una pasada secuencial,
+    saltando sin decodificar las líneas anteriores a la marca. Los borrados posteriores a la
+    marca se aplican con el mismo borrado en cascada que delete_project/delete_task: tras volver
+    a una copia anterior, Redis aún tiene esos objetos y sus conjuntos de eliminados no los ocultan.
+    """
+    start = time.perf_counter()
+    redis_client = get_sirope()._redis
+    journal = _backup_journal()
+    # Todos los procesos restauran al arrancar: el que llega segundo espera y ya encuentra la
+    # marca al día, en vez de leer los mismos blobs anteriores y sumar dos veces los contadores
+    with _restore_lock(redis_client):
+        # Lo encolado por este proceso ya está en Redis; escribirlo antes de leer el registro
+        journal.flush()
+
+        checkpoint = int(redis_client.get(_RESTORE_CHECKPOINT_KEY) or 0)
+        state = _read_backup_log(checkpoint)
+        # Proyectos antes que tareas, para que los contadores de tareas caigan sobre proyectos ya restaurados
+        projects = _objects_from_backup_state(state, 'projects')
+        tasks = _objects_from_backup_state(state, 'tasks')
+        objects = projects + tasks
+
+        deleted_projects = [obj_id for (kind, obj_id), (_, data) in state.items()
+                            if kind == 'projects' and data is None]
+        deleted_tasks = [obj_id for (kind, obj_id), (_, data) in state.items()
+                         if kind == 'tasks' and data is None]
+
+        batch_size = current_app.config.get('REDIS_BATCH_SIZE', 500)
+        for i in range(0, len(objects), batch_size):
+            _restore_objects(redis_client, objects[i:i + batch_size])
+        # Borrados después de las escrituras: un proyecto borrado se lleva también sus tareas
+        for project_id in deleted_projects:
+            _cascade_delete(project_id=project_id)
+        for i in range(0, len(deleted_tasks), batch_size):
+            _cascade_delete(task_ids=deleted_tasks[i:i + batch_size])
+        if state:
+            redis_client.set(_RESTORE_CHECKPOINT_KEY, max(ts for ts, _ in state.values()))
+
+    stats = {'projects': len(projects), 'tasks': len(tasks), 'deleted_projects': len(deleted_projects),
+             'deleted_tasks': len(deleted_tasks), 'records': len(state),
+             'seconds': round(time.perf_counter() - start, 3)}
+    current_app.logger.info(
+        f"Restauración incremental: {stats['projects']} proyectos y {stats['tasks']} tareas restaurados, "
+        f"{stats['deleted_projects']} proyectos y {stats['deleted_tasks']} tareas borrados, "
+        f"de {stats['records']} registros posteriores a la marca, en {stats['seconds']} s"
+    )
+    return stats
+
+def compact_backup_log():
+    """Forzar la compactación del registro de respaldos en una instantánea."""
+    journal = _backup_journal()
+    journal.flush()
+    return journal.log.compact(force=True)
+
+def convert_legacy_backups():
+    """Importar los directorios backup_projects y backup_tasks al registro de respaldos.
+
+    Los directorios importados se renombran con el sufijo .imported. Cada archivo entra con su
+    mtime como ts, que puede quedar por debajo de restore_checkpoint; si se ha importado algo,
+    la marca se borra para que el siguiente restore_backups repase el registro entero y los
+    incluya (convert_backups.py lo ejecuta a continuación).
+    """
+    from app.backup_log import import_legacy_backups
+    legacy_dirs = {
+        'projects': os.path.join(current_app.instance_path, _BACKUP_DIR),
+        'tasks': os.path.join(current_app.instance_path, _TASKS_BACKUP_DIR),
+    }
+    journal = _backup_journal()
+    journal.flush()
+    imported = import_legacy_backups(journal.log, legacy_dirs)
+    for directory in legacy_dirs.values():
+        if os.path.isdir(directory):
+            os.replace(directory, f"{directory}.imported")
+    journal.log.compact(force=True)
+    if any(imported.values()):
+        get_sirope()._redis.delete(_RESTORE_CHECKPOINT_KEY)
+    return imported
+
+# Funciones de mantenimiento de índices secundarios
+def _replace_hash(redis_client, key, mapping):
+    """Sustituir atómicamente el contenido de un hash de índice."""
+    pipe = redis_client.pipeline()
+    if mapping:
+        tmp_key = f"{key}:rebuild"
+        pipe.delete(tmp_key)
+        pipe.hset(tmp_key, mapping=mapping)
+        pipe.rename(tmp_key, key)
+    else:
+        pipe.delete(key)
+    pipe.execute()
+
+def _rebuild_user_indexes(redis_client):
+    """Reconstruir los índices username -> id y email -> id desde el hash User."""
+    usernames = {}
+    emails = {}
+    for user_id, serialized in redis_client.hscan_iter("User"):
+        user_id = _to_str(user_id)
+        try:
+            user = _loads(serialized)
+        except Exception as e:
+            current_app.logger.warning(f"Usuario {user_id} ilegible, se omite del índice: {str(e)}")
+            continue
+        
+        for mapping, attr in ((usernames, 'username'), (emails, 'email')):
+            value = getattr(user, attr, None)
+            if not value:
+                continue
+            if value in mapping:
+                current_app.logger.warning(f"{attr} duplicado '{value}' en usuarios {mapping[value]} y {user_id}")
+                continue
+            mapping[value] = user_id
+    
+    _replace_hash(redis_client, _USERNAME_INDEX, usernames)
+    _replace_hash(redis_client, _EMAIL_INDEX, emails)
+    return len(usernames)
+
+def _replace_sets(redis_client, key_pattern, groups):
+    """Sustituir todos los conjuntos de índice que siguen `key_pattern` ('prefijo:{}')."""
+    pipe = redis_client.pipeline()
+    for key in redis_client.scan_iter(match=key_pattern.format('*')):
+        pipe.delete(key)
+    for group_id, members in groups.items():
+        pipe.sadd(key_pattern.format(group_id), *members)
+    pipe.execute()
+
+def _replace_sorted_sets(redis_client, key_pattern, groups):
+    """Sustituir todos los sorted sets de índice que siguen `key_pattern`; `groups` es {id: {miembro: score}}."""
+    pipe = redis_client.pipeline()
+    for key in redis_client.scan_iter(match=key_pattern.format('*')):
+        pipe.delete(key)
+    for group_id, scores in groups.items():
+        pipe.zadd(key_pattern.format(group_id), scores)
+    pipe.execute()
+
+def _rebuild_task_indexes(redis_client):
+    """Reconstruir los índices de tareas desde el hash Task."""
+    by_project = {}
+    by_project_updated = {}
+    by_assignee = {}
+    count = 0
+    deleted = deleted_task_ids()
+    for task_id, serialized in redis_client.hscan_iter("Task"):
+        task_id = _to_str(task_id)
+        if task_id in deleted:
+            continue
+        try:
+            task = _loads(serialized)
+        except Exception as e:
+            current_app.logger.warning(f"Tarea {task_id} ilegible, se omite del índice: {str(e)}")
+            continue
+        
+        if getattr(task, 'project_id', None):
+            by_project.setdefault(task.project_id, set()).add(task_id)
+            by_project_updated.setdefault(task.project_id, {})[task_id] = _updated_score(task)
+        if getattr(task, 'assignee_id', None):
+            by_assignee.setdefault(task.assignee_id, set()).add(task_id)
+        count += 1
+    
+    _replace_sets(redis_client, _PROJECT_TASKS_KEY, by_project)
+    _replace_sorted_sets(redis_client, _PROJECT_TASKS_BY_UPDATE_KEY, by_project_updated)
+    _replace_sets(redis_client, _ASSIGNEE_TASKS_KEY, by_assignee)
+    return count
+
+def _rebuild_project_indexes(redis_client):
+    """Reconstruir los índices de propietario y miembros desde el hash Project."""
+    by_owner = {}
+    by_member = {}
+    by_owner_updated = {}
+    by_member_updated = {}
+    count = 0
+    deleted = deleted_project_ids()
+    for project_id, serialized in redis_client.hscan_iter("Project"):
+        project_id = _to_str(project_id)
+        if project_id in deleted:
+            continue
+        try:
+            project = _loads(serialized)
+        except Exception as e:
+            current_app.logger.warning(f"Proyecto {project_id} ilegible, se omite del índice: {str(e)}")
+            continue
+        
+        score = _updated_score(project)
+        if getattr(project, 'owner_id', None):
+            by_owner.setdefault(project.owner_id, set()).add(project_id)
+            by_owner_updated.setdefault(project.owner_id, {})[project_id] = score
+        for member_id in getattr(project, 'member_ids', []):
+            by_member.setdefault(member_id, set()).add(project_id)
+            by_member_updated.setdefault(member_id, {})[project_id] = score
+        count += 1
+    
+    _replace_sets(redis_client, _OWNER_PROJECTS_KEY, by_owner)
+    _replace_sets(redis_client, _MEMBER_PROJECTS_KEY, by_member)
+    _replace_sorted_sets(redis_client, _OWNER_PROJECTS_BY_UPDATE_KEY, by_owner_updated)
+    _replace_sorted_sets(redis_client, _MEMBER_PROJECTS_BY_UPDATE_KEY, by_member_updated)
+    return count
+
+def _rebuild_dashboards(redis_client):
+    """Reconstruir los dashboards materializados desde los hashes Project y Task."""
+    rows = {}
+    titles = {}
+    deleted = deleted_project_ids()
+    for project_id, serialized in redis_client.hscan_iter("Project"):
+        project_id = _to_str(project_id)
+        if project_id in deleted:
+            continue
+        project = _loads_or_none(serialized)
+        if project is None:
+            continue
+        titles[project_id] = project.title
+        row = _dashboard_project_row(project)
+        if getattr(project, 'owner_id', None):
+            rows.setdefault(project.owner_id, {})[f"o:{project_id}"] = row
+        for member_id in getattr(project, 'member_ids', []):
+            rows.setdefault(member_id, {})[f"m:{project_id}"] = row
+    
+    deleted = deleted_task_ids()
+    for task_id, serialized in redis_client.hscan_iter("Task"):
+        task_id = _to_str(task_id)
+        if task_id in deleted:
+            continue
+        task = _loads_or_none(serialized)
+        if task is None or not getattr(task, 'assignee_id', None):
+            continue
+        rows.setdefault(task.assignee_id, {})[f"t:{task_id}"] = _dashboard_task_row(
+            task, titles.get(str(task.project_id)))
+    
+    pipe = redis_client.pipeline()
+    for key in redis_client.scan_iter(match=_DASHBOARD_KEY.format('*')):
+        pipe.delete(key)
+    for user_id, mapping in rows.items():
+        pipe.hset(_DASHBOARD_KEY.format(user_id), mapping=mapping)
+    pipe.execute()
+    return len(rows)
+
+def _migrate_legacy_comments(redis_client):
+    """Mover los comentarios guardados por Sirope (JSON) al hash Comment."""
+    from sirope.coders import JSONDCoder
+    
+    migrated = 0
+    pipe = redis_client.pipeline()
+    for _, json_txt in redis_client.hscan_iter(_LEGACY_COMMENT_HASH):
+        try:
+            state = JSONDCoder().decode(_to_str(json_txt))
+            state.pop('__class__', None)
+            state.pop('__oid__', None)
+            comment = object.__new__(Comment)
+            comment.__setstate__(state)
+            pipe.hset("Comment", str(comment.id), _dumps(comment))
+            migrated += 1
+        except Exception as e:
+            current_app.logger.warning(f"Comentario de Sirope ilegible, se omite: {str(e)}")
+    pipe.delete(_LEGACY_COMMENT_HASH)
+    pipe.execute()
+    if migrated:
+        current_app.logger.info(f"Migrados {migrated} comentarios desde {_LEGACY_COMMENT_HASH}")
+    return migrated
+
+def _rebuild_comment_indexes(redis_client):
+    """Reconstruir los índices ordenados de comentarios por tarea desde el hash Comment."""
+    _migrate_legacy_comments(redis_client)
+    
+    by_task = {}
+    for comment_id, serialized in redis_client.hscan_iter("Comment"):
+        comment_id = _to_str(comment_id)
+        try:
+            comment = _loads(serialized)
+        except Exception as e:
+            current_app.logger.warning(f"Comentario {comment_id} ilegible, se omite del índice: {str(e)}")
+            continue
+        if getattr(comment, 'task_id', None):
+            by_task.setdefault(comment.task_id, {})[comment_id] = _comment_score(comment)
     
-    return tasks
+    _replace_sorted_sets(redis_client, _TASK_COMMENTS_KEY, by_task)
+    return sum(len(scores) for scores in by_task.values())
+
+def _rebuild_attachment_indexes(redis_client):
+    """Reconstruir los índices de adjuntos por tarea desde el hash Attachment."""
+    by_task = {}
+    count = 0
+    for attachment_id, serialized in redis_client.hscan_iter("Attachment"):
+        attachment_id = _to_str(attachment_id)
+        try:
+            attachment = _loads(serialized)
+        except Exception as e:
+            current_app.logger.warning(f"Adjunto {attachment_id} ilegible, se omite del índice: {str(e)}")
+            continue
+        if getattr(attachment, 'task_id', None):
+            by_task.setdefault(str(attachment.task_id), set()).add(attachment_id)
+            count += 1
+    
+    _replace_sets(redis_client, _TASK_ATTACHMENTS_KEY, by_task)
+    return count
+
+def _rebuild_object_types(redis_client):
+    """Reconstruir el directorio id -> clase a partir de los hashes de objetos."""
+    object_types = {}
+    for cls_name in _OBJECT_HASHES:
+        for object_id in redis_client.hkeys(cls_name):
+            object_types[_to_str(object_id)] = cls_name
+    _replace_hash(redis_client, _OBJECT_TYPES_KEY, object_types)
+    return len(object_types)
+
+def repair_counters():
+    """Recalcular los contadores de tareas y miembros de cada proyecto desde los datos guardados."""
+    s = get_sirope()
+    task_counts = {}
+    member_counts = {}
+    for batch in iter_object_batches("Project", deleted_project_ids()):
+        for project in batch:
+            task_counts[str(project.id)] = 0
+            member_counts[str(project.id)] = len(getattr(project, 'member_ids', []))
+    for batch in iter_object_batches("Task", deleted_task_ids()):
+        for task in batch:
+            project_id = str(getattr(task, 'project_id', None))
+            if project_id in task_counts:
+                task_counts[project_id] += 1
+    
+    _replace_hash(s._redis, _PROJECT_TASK_COUNTS, task_counts)
+    _replace_hash(s._redis, _PROJECT_MEMBER_COUNTS, member_counts)
+    current_app.logger.info(f"Contadores recalculados para {len(task_counts)} proyectos")
+    return len(task_counts)
+
+def rebuild_indexes():
+    """Reconstruir todos los índices secundarios a partir de los datos guardados."""
+    s = get_sirope()
+    results = {
+        'users': _rebuild_user_indexes(s._redis),
+        'projects': _rebuild_project_indexes(s._redis),
+        'tasks': _rebuild_task_indexes(s._redis),
+        'comments': _rebuild_comment_indexes(s._redis),
+        'attachments': _rebuild_attachment_indexes(s._redis),
+        'object_types': _rebuild_object_types(s._redis),
+        'counters': repair_counters(),
+        'dashboards': _rebuild_dashboards(s._redis),
+    }
+    s._redis.set(_INDEX_VERSION_KEY, _INDEX_VERSION)
+    current_app.logger.info(f"Índices reconstruidos: {results}")
+    return results
+
+def ensure_indexes():
+    """Reconstruir los índices solo si la versión guardada en Redis está desactualizada."""
+    s = get_sirope()
+    stored_version = s._redis.get(_INDEX_VERSION_KEY)
+    if stored_version is not None and int(stored_version) >= _INDEX_VERSION:
+        return False
+    current_app.logger.info(f"Versión de índices {_to_str(stored_version)} < {_INDEX_VERSION}, reconstruyendo")
+    rebuild_indexes()
+    return True
 
 # Llamar a la función de limpieza al iniciar la aplicación
 def init_cleanup():
     """Realizar limpieza inicial al arrancar la aplicación."""
     try:
-        s = get_sirope()
-        
-        # FORZAR CARGA DE TODOS LOS RESPALDOS SIN EXCEPCIÓN
-        current_app.logger.info("==== RESTAURACIÓN FORZADA DE PROYECTOS ====")
-        
-        # RESTAURAR PROYECTOS DESDE JSON
-        backup_projects = _load_project_backups()
-        projects_restored = 0
-        
-        for project in backup_projects:
-            try:
-                # GUARDAR PROYECTO DIRECTAMENTE EN REDIS
-                serialized = pickle.dumps(project)
-                s._redis.hset("Project", str(project.id), serialized)
-                current_app.logger.info(f"Proyecto restaurado en Redis: {project.id} - {project.title}")
-                projects_restored += 1
-            except Exception as e:
-                current_app.logger.error(f"Error al restaurar proyecto {project.id}: {str(e)}")
-        
-        current_app.logger.info(f"Total: {projects_restored} proyectos restaurados exitosamente")
-        
-        # RESTAURAR TAREAS DESDE JSON
-        current_app.logger.info("==== RESTAURACIÓN FORZADA DE TAREAS ====")
-        backup_tasks = _load_task_backups()
-        tasks_restored = 0
+        # Construir los índices secundarios si aún no existen
+        try:
+            ensure_indexes()
+        except Exception as e:
+            current_app.logger.error(f"Error al construir índices: {str(e)}")
         
-        for task in backup_tasks:
-            try:
-                # GUARDAR TAREA DIRECTAMENTE EN REDIS
-                serialized = pickle.dumps(task)
-                s._redis.hset("Task", str(task.id), serialized)
-                current_app.logger.info(f"Tarea restaurada en Redis: {task.id} - {task.title}")
-                tasks_restored += 1
-            except Exception as e:
-                current_app.logger.error(f"Error al restaurar tarea {task.id}: {str(e)}")
+        # Restaurar solo los cambios que Redis aún no tiene (ver restore_backups)
+        restore_backups()
         
-        current_app.logger.info(f"Total: {tasks_restored} tareas restauradas exitosamente")
+        for legacy_dir in (_BACKUP_DIR, _TASKS_BACKUP_DIR):
+            if os.path.isdir(os.path.join(current_app.instance_path, legacy_dir)):
+                current_app.logger.warning(
+                    f"Existe el directorio de respaldos antiguo {legacy_dir}: "
+                    f"ejecutar convert_backups.py para importarlo al registro de respaldos "
+                    f"(la restauración de este arranque no lo ha incluido)"
+                )
         
     except Exception as e:
         current_app.logger.error(f"Error en restauración: {str(e)}")
 
 def list_all_tasks_in_redis():
     """Función para listar todas las tareas disponibles."""
-    s = get_sirope()
     try:
         current_app.logger.info("=== LISTANDO TODAS LAS TAREAS ===")
         
-        # 1. Intentar cargar tareas de Redis primero
+        # 1. Intentar cargar tareas de Redis primero, en lotes
         all_tasks = []
-        task_ids = s._redis.hkeys("Task")
-        current_app.logger.info(f"Encontradas {len(task_ids)} tareas en Redis")
-        
-        # Cargar cada tarea desde Redis
-        for task_id_bytes in task_ids:
-            try:
-                # Convertir ID a string si es necesario
-                task_id = task_id_bytes
-                if isinstance(task_id_bytes, bytes):
-                    task_id = task_id_bytes.decode('utf-8')
-                
-                # Ignorar tareas eliminadas
-                if str(task_id) in _deleted_task_ids:
-                    continue
-                
-                # Obtener datos de la tarea desde Redis
-                serialized = s._redis.hget("Task", task_id)
-                if serialized:
-                    task = pickle.loads(serialized)
-                    all_tasks.append(task)
-                    current_app.logger.info(f"Tarea cargada desde Redis: {task.id} - {task.title}")
-            except Exception as e:
-                current_app.logger.warning(f"Error al cargar tarea {task_id}: {str(e)}")
+        for batch in iter_object_batches("Task", deleted_task_ids()):
+            all_tasks.extend(batch)
+        current_app.logger.info(f"Cargadas {len(all_tasks)} tareas desde Redis")
         
         # 2. Si no hay tareas en Redis, cargar desde respaldos
         if not all_tasks:
@@ -1183,7 +2037,7 @@ def list_all_tasks_in_redis():
             # Cargar desde backups JSON
             backup_tasks = _load_task_backups()
             for task in backup_tasks:
-                if str(task.id) not in _deleted_task_ids:
+                if not is_task_deleted(task.id):
                     all_tasks.append(task)
                     current_app.logger.info(f"Tarea cargada desde backup: {task.id} - {task.title}")
         
@@ -1197,7 +2051,7 @@ def list_all_tasks_in_redis():
         try:
             backup_tasks = _load_task_backups()
             current_app.logger.info(f"Recuperadas {len(backup_tasks)} tareas desde backups como último recurso")
-            return [t for t in backup_tasks if str(t.id) not in _deleted_task_ids]
+            return [t for t in backup_tasks if not is_task_deleted(t.id)]
         except:
             return []
 
@@ -1205,6 +2059,7 @@ def get_attachment_by_id(attachment_id):
     """Obtener un adjunto por su ID."""
     s = get_sirope()
     try:
-        return s.load(attachment_id)
+        serialized = s._redis.hget("Attachment", str(attachment_id))
+        return _loads(serialized) if serialized else None
     except Exception:
         return None 
\ No newline at end of file
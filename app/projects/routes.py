@@ -1,28 +1,38 @@
-from flask import render_template, flash, redirect, url_for, request, abort
+from flask import render_template, flash, redirect, url_for, request, abort, jsonify, current_app
 from flask_login import current_user, login_required
 from app.projects import bp
 from app.projects.forms import ProjectForm, ProjectEditForm
 from app.models import Project, User
 from app.persistence import (
-    save_project, get_project_by_id, get_projects_by_owner, 
-    get_projects_by_member, delete_project, get_user_by_username,
-    get_tasks_by_project, get_user_by_id, count_project_tasks,
-    count_project_members, get_project_owner
+    save_project, get_project_by_id, delete_project, get_user_by_username,
+    get_tasks_by_project, identity_map_disabled,
+    get_project_counts, is_project_deleted, get_projects_page_by_owner,
+    get_projects_page_by_member, get_tasks_page_by_project, get_project_version,
+    get_users_by_ids
 )
-from app.persistence import _deleted_project_ids
+from app.persistence import _save_deleted_project
 
 @bp.route('/projects')
 @login_required
 def projects():
-    owned_projects = get_projects_by_owner(current_user.id)
-    member_projects = get_projects_by_member(current_user.id)
+    # Cada listado se pagina con su propio cursor (los modificados más recientemente primero)
+    owned_cursor = request.args.get('owned')
+    member_cursor = request.args.get('member')
+    owned_projects, owned_next = get_projects_page_by_owner(current_user.id, owned_cursor)
+    member_projects, member_next = get_projects_page_by_member(current_user.id, member_cursor)
+    # Contadores de todas las filas en un solo round trip, y propietarios en otro
+    project_counts = get_project_counts([p.id for p in owned_projects + member_projects])
+    owners = get_users_by_ids([p.owner_id for p in member_projects])
     return render_template('projects/projects.html',
                          title='My Projects',
                          owned_projects=owned_projects,
                          member_projects=member_projects,
-                         count_project_tasks=count_project_tasks,
-                         count_project_members=count_project_members,
-                         get_project_owner=get_project_owner)
+                         owned_cursor=owned_cursor,
+                         owned_next=owned_next,
+                         member_cursor=member_cursor,
+                         member_next=member_next,
+                         project_counts=project_counts,
+                         owners=owners)
 
 @bp.route('/projects/create', methods=['GET', 'POST'])
 @login_required
@@ -38,15 +48,12 @@ def create_project():
         
         # Guardar el proyecto
         try:
-            # Aquí aseguramos que no está en la lista de eliminados
-            if str(project.id) in _deleted_project_ids:
-                _deleted_project_ids.remove(str(project.id))
-            
-            # Guardar el proyecto
+            # Guardar el proyecto (save_project lo quita de la lista de eliminados si estuviera)
             oid = save_project(project)
             
-            # Verificar que se guardó correctamente
-            saved_project = get_project_by_id(project.id)
+            # Verificar que se guardó correctamente (leyendo desde Redis, no del mapa de identidad)
+            with identity_map_disabled():
+                saved_project = get_project_by_id(project.id)
             if saved_project:
                 flash('Project created successfully!', 'success')
             else:
@@ -73,7 +80,7 @@ def view_project(project_id):
     from app.persistence import get_sirope
     
     # Verificar primero si está en la lista de eliminados
-    if str(project_id) in _deleted_project_ids:
+    if is_project_deleted(project_id):
         flash('Este proyecto ha sido eliminado.', 'warning')
         return redirect(url_for('projects.projects'))
     
@@ -88,49 +95,83 @@ def view_project(project_id):
     # Marcar como eliminado si no existe en Redis
     s = get_sirope()
     if not s._redis.hexists("Project", str(project_id)):
-        _deleted_project_ids.add(str(project_id))
+        _save_deleted_project(project_id)
         flash('Este proyecto ha sido eliminado de la base de datos.', 'warning')
         return redirect(url_for('projects.projects'))
     
-    # Obtener tareas asociadas al proyecto
-    tasks = get_tasks_by_project(project_id)
-    
-    # Obtener información del propietario
-    owner = get_user_by_id(project.owner_id)
+    # Obtener una página de tareas del proyecto (las modificadas más recientemente primero)
+    cursor = request.args.get('cursor')
+    tasks, next_cursor = get_tasks_page_by_project(project_id, cursor)
     
-    # Obtener información de los miembros
-    members = []
-    for member_id in project.member_ids:
-        member = get_user_by_id(member_id)
-        if member:
-            members.append(member)
+    # Propietario, miembros y asignados de la página en un solo HMGET
+    users = get_users_by_ids([project.owner_id] + list(project.member_ids) +
+                             [task.assignee_id for task in tasks])
+    owner = users.get(str(project.owner_id))
+    members = [users[str(member_id)] for member_id in project.member_ids if str(member_id) in users]
     
     # Obtener asignados de tareas
     task_assignees = {}
     for task in tasks:
-        if task.assignee_id:
-            assignee = get_user_by_id(task.assignee_id)
-            if assignee:
-                task_assignees[task.id] = {
-                    'username': assignee.username,
-                    'id': assignee.id
-                }
+        assignee = users.get(str(task.assignee_id)) if task.assignee_id else None
+        if assignee:
+            task_assignees[task.id] = {
+                'username': assignee.username,
+                'id': assignee.id
+            }
     
     return render_template('projects/view_project.html',
                          title=project.title,
                          project=project,
                          tasks=tasks,
+                         cursor=cursor,
+                         next_cursor=next_cursor,
                          owner=owner,
                          members=members,
                          task_assignees=task_assignees)
 
+@bp.route('/projects/<project_id>/board')
+@login_required
+def project_board(project_id):
+    if is_project_deleted(project_id):
+        abort(404)
+    
+    project = get_project_by_id(project_id)
+    if not project:
+        abort(404)
+    
+    if project.owner_id != current_user.id and current_user.id not in project.member_ids:
+        abort(403)
+    
+    # La versión se lee antes que las tareas: si cambia entretanto, la respuesta es
+    # más nueva que su ETag y la siguiente petición la vuelve a descargar
+    version = get_project_version(project_id)
+    etag = f"{project_id}-{version}"
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        columns = {'todo': [], 'in_progress': [], 'done': []}
+        for task in sorted(get_tasks_by_project(project_id), key=lambda t: t.created_at):
+            columns.setdefault(task.status, []).append({
+                'id': task.id,
+                'title': task.title,
+                'status': task.status,
+                'priority': task.priority,
+                'assignee_id': task.assignee_id,
+                'due_date': task.due_date.isoformat() if task.due_date else None,
+                'url': url_for('tasks.view_task', task_id=task.id),
+            })
+        response = jsonify({'project_id': project.id, 'version': version, 'columns': columns})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @bp.route('/projects/<project_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_project(project_id):
     from app.persistence import get_sirope
     
     # Verificar primero si está en la lista de eliminados
-    if str(project_id) in _deleted_project_ids:
+    if is_project_deleted(project_id):
         flash('Este proyecto ha sido eliminado.', 'warning')
         return redirect(url_for('projects.projects'))
     
@@ -145,7 +186,7 @@ def edit_project(project_id):
     # Marcar como eliminado si no existe en Redis
     s = get_sirope()
     if not s._redis.hexists("Project", str(project_id)):
-        _deleted_project_ids.add(str(project_id))
+        _save_deleted_project(project_id)
         flash('Este proyecto ha sido eliminado de la base de datos.', 'warning')
         return redirect(url_for('projects.projects'))
     
@@ -169,24 +210,21 @@ def edit_project(project_id):
 @login_required
 def delete_project_route(project_id):
     # Verificar primero si ya está en la lista de eliminados
-    if str(project_id) in _deleted_project_ids:
+    if is_project_deleted(project_id):
         flash('Este proyecto ya había sido eliminado.', 'info')
         return redirect(url_for('projects.projects'))
     
     project = get_project_by_id(project_id)
     if not project:
         # Si no se encuentra, añadirlo a la lista de eliminados por si acaso
-        _deleted_project_ids.add(str(project_id))
+        _save_deleted_project(project_id)
         flash('Proyecto no encontrado. Ha sido marcado como eliminado.', 'warning')
         return redirect(url_for('projects.projects'))
     
     if project.owner_id != current_user.id:
         abort(403)
     
-    # Marcar como eliminado en la lista de eliminados primero
-    _deleted_project_ids.add(str(project_id))
-    
-    # Intentar eliminar físicamente
+    # Eliminar el proyecto con sus tareas y marcarlo como eliminado (una sola transacción)
     delete_project(project_id)
     
     flash('Project deleted successfully!', 'success')
@@ -198,7 +236,7 @@ def add_member(project_id):
     from app.persistence import get_sirope
     
     # Verificar primero si está en la lista de eliminados
-    if str(project_id) in _deleted_project_ids:
+    if is_project_deleted(project_id):
         flash('Este proyecto ha sido eliminado.', 'warning')
         return redirect(url_for('projects.projects'))
     
@@ -213,7 +251,7 @@ def add_member(project_id):
     # Marcar como eliminado si no existe en Redis
     s = get_sirope()
     if not s._redis.hexists("Project", str(project_id)):
-        _deleted_project_ids.add(str(project_id))
+        _save_deleted_project(project_id)
         flash('Este proyecto ha sido eliminado de la base de datos.', 'warning')
         return redirect(url_for('projects.projects'))
     
@@ -237,7 +275,7 @@ def remove_member(project_id, user_id):
     from app.persistence import get_sirope
     
     # Verificar primero si está en la lista de eliminados
-    if str(project_id) in _deleted_project_ids:
+    if is_project_deleted(project_id):
         flash('Este proyecto ha sido eliminado.', 'warning')
         return redirect(url_for('projects.projects'))
     
@@ -252,7 +290,7 @@ def remove_member(project_id, user_id):
     # Marcar como eliminado si no existe en Redis
     s = get_sirope()
     if not s._redis.hexists("Project", str(project_id)):
-        _deleted_project_ids.add(str(project_id))
+        _save_deleted_project(project_id)
         flash('Este proyecto ha sido eliminado de la base de datos.', 'warning')
         return redirect(url_for('projects.projects'))
     
@@ -0,0 +1,150 @@
+import re
+import time
+from collections import Counter
+import redis
+from flask import current_app, g, request
+
+# Contabilidad de Redis por petición: comandos, round trips, bytes (aproximados) y tiempo,
+# más un detector de N+1 (la misma forma de comando repetida en round trips distintos).
+# Con REDIS_INSTRUMENTATION desactivado get_sirope() usa un cliente redis.Redis normal
+# y no se registra ningún hook, así que el coste es nulo.
+
+# Ids (uuid, hexadecimales largos o números) dentro de las claves: se sustituyen por '*'
+# para que todas las claves del mismo índice tengan la misma forma
+_ID_PATTERN = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}|[0-9a-fA-F]{16,}|\d+')
+
+
+def _shape(args):
+    """Forma de un comando: nombre y clave con los ids normalizados."""
+    name = str(args[0]).upper()
+    if len(args) < 2:
+        return name
+    key = args[1]
+    if isinstance(key, bytes):
+        key = key.decode('utf-8', 'replace')
+    return f"{name} {_ID_PATTERN.sub('*', str(key))}"
+
+
+def _size(value):
+    """Tamaño aproximado en bytes de un argumento o una respuesta."""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (list, tuple, set)):
+        return sum(_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_size(k) + _size(v) for k, v in value.items())
+    return 8
+
+
+class RequestRedisStats:
+    """Contadores de Redis de una petición."""
+
+    def __init__(self):
+        self.commands = 0
+        self.round_trips = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, commands, elapsed, response):
+        """Anotar un round trip con sus comandos ([args, ...]) y su respuesta."""
+        self.round_trips += 1
+        self.commands += len(commands)
+        self.seconds += elapsed
+        self.bytes_sent += sum(_size(arg) for args in commands for arg in args)
+        self.bytes_received += _size(response)
+        if len(commands) == 1:
+            self.shapes[_shape(commands[0])] += 1
+        else:
+            # Un pipeline que se repite por fila también es un N+1
+            self.shapes['PIPELINE ' + ' | '.join(sorted({_shape(args) for args in commands}))] += 1
+
+    def repeated(self, threshold):
+        """Formas de comando repetidas en más de `threshold` round trips."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+    """Pipeline que anota cada ejecución como un único round trip."""
+
+    def __init__(self, *args, stats, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._request_stats = stats
+
+    def immediate_execute_command(self, *args, **options):
+        # Comandos inmediatos mientras hay WATCH activo
+        start = time.perf_counter()
+        response = super().immediate_execute_command(*args, **options)
+        self._request_stats.record([args], time.perf_counter() - start, response)
+        return response
+
+    def execute(self, raise_on_error=True):
+        commands = [args for args, _ in self.command_stack]
+        start = time.perf_counter()
+        response = super().execute(raise_on_error)
+        if commands:
+            self._request_stats.record(commands, time.perf_counter() - start, response)
+        return response
+
+
+class InstrumentedRedis(redis.Redis):
+    """Cliente Redis que anota cada comando en las estadísticas de la petición."""
+
+    def __init__(self, *args, stats, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._request_stats = stats
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        response = super().execute_command(*args, **options)
+        self._request_stats.record([args], time.perf_counter() - start, response)
+        return response
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction,
+                                    shard_hint, stats=self._request_stats)
+
+
+def create_client(connection_pool):
+    """Cliente Redis de la petición: instrumentado solo si REDIS_INSTRUMENTATION está activo."""
+    if not current_app.config.get('REDIS_INSTRUMENTATION'):
+        return redis.Redis(connection_pool=connection_pool)
+    if 'redis_stats' not in g:
+        g.redis_stats = RequestRedisStats()
+    return InstrumentedRedis(connection_pool=connection_pool, stats=g.redis_stats)
+
+
+def _report(response):
+    stats = g.pop('redis_stats', None)
+    if stats is None:
+        return response
+
+    duration_ms = stats.seconds * 1000
+    entries = [
+        f'redis;dur={duration_ms:.2f};desc="{stats.commands} cmd, {stats.round_trips} rt, '
+        f'{stats.bytes_sent} B out, {stats.bytes_received} B in"'
+    ]
+    threshold = current_app.config['REDIS_N_PLUS_ONE_THRESHOLD']
+    repeated = stats.repeated(threshold)
+    if repeated:
+        shape, count = repeated[0]
+        entries.append(f'redis-n1;desc="{shape} x{count}"')
+        current_app.logger.warning(
+            f"Posible N+1 en {request.method} {request.path}: "
+            + ', '.join(f"{shape} x{count}" for shape, count in repeated)
+        )
+    response.headers.add('Server-Timing', ', '.join(entries))
+    current_app.logger.debug(
+        f"Redis {request.method} {request.path}: {stats.commands} comandos en {stats.round_trips} "
+        f"round trips, {stats.bytes_sent} B enviados, {stats.bytes_received} B recibidos, {duration_ms:.2f} ms"
+    )
+    return response
+
+
+def init_redis_metrics(app):
+    """Registrar el informe por petición si REDIS_INSTRUMENTATION está activo."""
+    if app.config.get('REDIS_INSTRUMENTATION'):
+        app.after_request(_report)
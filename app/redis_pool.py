@@ -0,0 +1,63 @@
+import threading
+import time
+import redis
+
+# Pool de conexiones a Redis compartido por todas las peticiones de un proceso.
+# redis-py detecta el cambio de PID tras un fork, así que cada worker acaba con su propio pool.
+
+class InstrumentedConnectionPool(redis.BlockingConnectionPool):
+    """Pool bloqueante que cuenta aciertos, conexiones nuevas y tiempo de espera."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._acquired = 0
+        self._created = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    def make_connection(self):
+        with self._stats_lock:
+            self._created += 1
+        return super().make_connection()
+
+    def get_connection(self, *args, **kwargs):
+        start = time.perf_counter()
+        connection = super().get_connection(*args, **kwargs)
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self._acquired += 1
+            self._wait_time += waited
+            self._max_wait_time = max(self._max_wait_time, waited)
+        return connection
+
+    def stats(self):
+        """Estadísticas acumuladas del pool en este proceso."""
+        with self._stats_lock:
+            acquired, created = self._acquired, self._created
+            wait_time, max_wait_time = self._wait_time, self._max_wait_time
+        return {
+            'max_connections': self.max_connections,
+            'connections_created': created,
+            'acquisitions': acquired,
+            'hits': max(acquired - created, 0),
+            'misses': created,
+            'wait_time_total_ms': round(wait_time * 1000, 3),
+            'wait_time_avg_ms': round(wait_time * 1000 / acquired, 3) if acquired else 0.0,
+            'wait_time_max_ms': round(max_wait_time * 1000, 3),
+        }
+
+
+def init_redis(app):
+    """Crear el pool de conexiones del proceso a partir de la configuración de la app."""
+    pool = InstrumentedConnectionPool(
+        host=app.config['REDIS_HOST'],
+        port=app.config['REDIS_PORT'],
+        password=app.config.get('REDIS_PASSWORD') or None,
+        max_connections=app.config['REDIS_MAX_CONNECTIONS'],
+        timeout=app.config['REDIS_POOL_TIMEOUT'],
+        # PING solo si la conexión lleva más de este intervalo sin usarse
+        health_check_interval=app.config['REDIS_HEALTH_CHECK_INTERVAL'],
+    )
+    app.extensions['redis_pool'] = pool
+    return pool
@@ -17,18 +17,20 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Handle Kanban drag-and-drop if on task board
     const kanbanItems = document.querySelectorAll('.kanban-item');
-    if (kanbanItems.length > 0) {
-        kanbanItems.forEach(item => {
-            item.addEventListener('dragstart', handleDragStart);
-            item.addEventListener('dragend', handleDragEnd);
-        });
-        
-        const kanbanColumns = document.querySelectorAll('.kanban-column');
-        kanbanColumns.forEach(column => {
-            column.addEventListener('dragover', handleDragOver);
-            column.addEventListener('drop', handleDrop);
-        });
-    }
+    kanbanItems.forEach(item => {
+        item.addEventListener('dragstart', handleDragStart);
+        item.addEventListener('dragend', handleDragEnd);
+    });
+    
+    // Columns accept drops even when empty: board items are rendered later from JSON
+    const kanbanColumns = document.querySelectorAll('.kanban-column');
+    kanbanColumns.forEach(column => {
+        column.addEventListener('dragover', handleDragOver);
+        column.addEventListener('drop', handleDrop);
+    });
+    
+    // Load Kanban boards from their JSON endpoint
+    document.querySelectorAll('.kanban-board[data-board-url]').forEach(refreshKanbanBoard);
     
     // Ajax for task status updates
     const statusForms = document.querySelectorAll('.task-status-form');
@@ -106,7 +108,62 @@ function handleDrop(e) {
             // Move the task visually
             const task = document.querySelector(`[data-task-id="${taskId}"]`);
             this.querySelector('.kanban-items').appendChild(task);
+            
+            // Pick up changes made by other users (304 if nothing else changed)
+            const board = this.closest('.kanban-board[data-board-url]');
+            if (board) {
+                refreshKanbanBoard(board);
+            }
         }
     })
     .catch(error => console.error('Error:', error));
-} 
\ No newline at end of file
+}
+
+// Kanban board refresh: the board endpoint answers 304 while the project's tasks are unchanged
+const kanbanBoardETags = {};
+
+function refreshKanbanBoard(board) {
+    const url = board.getAttribute('data-board-url');
+    const headers = {'X-Requested-With': 'XMLHttpRequest'};
+    if (kanbanBoardETags[url]) {
+        headers['If-None-Match'] = kanbanBoardETags[url];
+    }
+    
+    return fetch(url, {headers: headers, cache: 'no-store'})
+    .then(response => {
+        if (response.status === 304) {
+            return null;
+        }
+        kanbanBoardETags[url] = response.headers.get('ETag');
+        return response.json();
+    })
+    .then(data => {
+        if (!data) {
+            return;
+        }
+        Object.entries(data.columns).forEach(([status, tasks]) => {
+            const items = board.querySelector(`.kanban-column[data-status="${status}"] .kanban-items`);
+            if (items) {
+                items.replaceChildren(...tasks.map(renderKanbanItem));
+            }
+        });
+    })
+    .catch(error => console.error('Error:', error));
+}
+
+function renderKanbanItem(task) {
+    const item = document.createElement('div');
+    item.className = 'kanban-item';
+    item.draggable = true;
+    item.setAttribute('data-task-id', task.id);
+    
+    const link = document.createElement('a');
+    link.href = task.url;
+    link.className = 'text-decoration-none';
+    link.textContent = task.title;
+    item.appendChild(link);
+    
+    item.addEventListener('dragstart', handleDragStart);
+    item.addEventListener('dragend', handleDragEnd);
+    return item;
+}
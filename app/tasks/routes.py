@@ -6,7 +6,8 @@ from app.models import Task, Project, Comment, User, Attachment
 from app.persistence import (
     get_project_by_id, save_task, get_task_by_id, delete_task, 
     get_user_by_username, save_comment, get_comments_by_task,
-    save_attachment, get_attachments_by_task, get_attachment_by_id, delete_object_by_id
+    save_attachment, get_attachments_by_task, get_attachment_by_id, delete_object_by_id,
+    delete_attachment_record, get_users_by_ids
 )
 import os
 from werkzeug.utils import secure_filename
@@ -58,17 +59,18 @@ def view_task(task_id):
     comments = get_comments_by_task(task_id)
     attachments = get_attachments_by_task(task_id)
     
+    # Autores de los comentarios y asignado en un solo HMGET
+    users = get_users_by_ids([comment.user_id for comment in comments] + [task.assignee_id])
+    
     # Enriquecer comentarios con el nombre de usuario
-    from app.persistence import get_user_by_id
     for comment in comments:
-        user = get_user_by_id(comment.user_id)
+        user = users.get(str(comment.user_id))
         comment.user_name = user.username if user else 'User'
         comment.user_profile_picture = getattr(user, "profile_picture", None) or '/static/profile_pics/default.png'
     
     assignee_name = None
     if task.assignee_id:
-        from app.persistence import get_user_by_id
-        assignee = get_user_by_id(task.assignee_id)
+        assignee = users.get(str(task.assignee_id))
         if assignee:
             assignee_name = assignee.username
     
@@ -334,27 +336,19 @@ def download_attachment(filename):
 @bp.route('/tasks/attachment/<attachment_id>/delete', methods=['POST'])
 @login_required
 def delete_attachment(attachment_id):
-    from app.persistence import get_attachments_by_task, save_attachment
-    from app.models import Attachment
-    import pickle
-    s = current_app.extensions['sirope'] if 'sirope' in current_app.extensions else None
-    if not s:
-        import sirope
-        s = sirope.Sirope()
     # Buscar el adjunto en Redis
-    serialized = s._redis.hget("Attachment", str(attachment_id))
+    attachment = get_attachment_by_id(attachment_id)
     task_id = request.form.get('task_id')
-    if serialized:
-        attachment = pickle.loads(serialized)
+    if attachment:
         # Eliminar archivo físico si existe
         try:
             if os.path.exists(attachment.file_path):
                 os.remove(attachment.file_path)
         except Exception as e:
             current_app.logger.warning(f"No se pudo eliminar el archivo físico: {e}")
-        # Eliminar registro en Redis
-        s._redis.hdel("Attachment", str(attachment_id))
+        # Eliminar registro e índice en Redis
+        delete_attachment_record(attachment)
         flash('Attachment deleted successfully!', 'success')
     else:
         flash('Attachment not found.', 'warning')
-    return redirect(url_for('tasks.view_task', task_id=task_id)) 
\ No newline at end of file
+    return redirect(url_for('tasks.view_task', task_id=task_id))
\ No newline at end of file
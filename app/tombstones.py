@@ -0,0 +1,115 @@
+import threading
+
+# Ids de proyectos y tareas eliminados, compartidos por todos los workers.
+# Redis guarda los conjuntos y un contador de generación que se incrementa en cada cambio;
+# cada proceso mantiene una copia y solo vuelve a leer los conjuntos cuando la generación cambia.
+GENERATION_KEY = 'tombstones_generation'
+PROJECTS_KEY = 'deleted_projects'
+TASKS_KEY = 'deleted_tasks'
+
+
+def _decode_ids(ids):
+    return frozenset(i.decode('utf-8') if isinstance(i, bytes) else i for i in ids)
+
+
+class TombstoneCache:
+    """Copia local y versionada de los conjuntos de eliminados."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.generation = None
+        self.projects = frozenset()
+        self.tasks = frozenset()
+        self.reloads = 0
+
+    def refresh(self, redis_client, generation):
+        """Recargar los conjuntos solo si la generación leída (get_sirope) ha cambiado."""
+        generation = int(generation or 0)
+        if generation != self.generation:
+            self.reload(redis_client)
+
+    def reload(self, redis_client):
+        """Leer la generación y los dos conjuntos en una transacción."""
+        pipe = redis_client.pipeline()
+        pipe.get(GENERATION_KEY)
+        pipe.smembers(PROJECTS_KEY)
+        pipe.smembers(TASKS_KEY)
+        generation, projects, tasks = pipe.execute()
+        generation = int(generation or 0)
+        with self._lock:
+            # Una recarga lenta no debe pisar un estado más reciente
+            if self.generation is not None and generation < self.generation:
+                return
+            self.generation = generation
+            self.projects = _decode_ids(projects)
+            self.tasks = _decode_ids(tasks)
+            self.reloads += 1
+
+    @staticmethod
+    def queue_add(pipe, project_ids=(), task_ids=()):
+        """Encolar en `pipe` el marcado de eliminados y el incremento de generación.
+
+        Debe ser lo último del pipeline: su último resultado es la generación nueva,
+        que se pasa después a `applied`.
+        """
+        if project_ids:
+            pipe.sadd(PROJECTS_KEY, *[str(i) for i in project_ids])
+        if task_ids:
+            pipe.sadd(TASKS_KEY, *[str(i) for i in task_ids])
+        pipe.incr(GENERATION_KEY)
+
+    def applied(self, redis_client, generation, add=None, remove=None):
+        """Reflejar en local un cambio ya escrito en Redis con la generación `generation`.
+
+        `add` y `remove` son {'projects': ids, 'tasks': ids}.
+        """
+        add = add or {}
+        remove = remove or {}
+        with self._lock:
+            if self.generation == generation - 1:
+                # Ningún otro proceso ha cambiado nada entretanto: aplicar el cambio en local
+                for attr in ('projects', 'tasks'):
+                    added = [str(i) for i in add.get(attr, ())]
+                    removed = [str(i) for i in remove.get(attr, ())]
+                    if added or removed:
+                        setattr(self, attr, getattr(self, attr).union(added).difference(removed))
+                self.generation = generation
+                return
+        self.reload(redis_client)
+
+    def _update(self, redis_client, key, attr, add=(), remove=()):
+        pipe = redis_client.pipeline()
+        if add:
+            pipe.sadd(key, *[str(i) for i in add])
+        if remove:
+            pipe.srem(key, *[str(i) for i in remove])
+        pipe.incr(GENERATION_KEY)
+        generation = pipe.execute()[-1]
+        self.applied(redis_client, generation, add={attr: add}, remove={attr: remove})
+
+    def add_projects(self, redis_client, *project_ids):
+        self._update(redis_client, PROJECTS_KEY, 'projects', add=project_ids)
+
+    def remove_projects(self, redis_client, *project_ids):
+        self._update(redis_client, PROJECTS_KEY, 'projects', remove=project_ids)
+
+    def add_tasks(self, redis_client, *task_ids):
+        self._update(redis_client, TASKS_KEY, 'tasks', add=task_ids)
+
+    def remove_tasks(self, redis_client, *task_ids):
+        self._update(redis_client, TASKS_KEY, 'tasks', remove=task_ids)
+
+    def stats(self):
+        return {
+            'generation': self.generation,
+            'deleted_projects': len(self.projects),
+            'deleted_tasks': len(self.tasks),
+            'reloads': self.reloads,
+        }
+
+
+def init_tombstones(app):
+    """Crear la caché de eliminados del proceso."""
+    cache = TombstoneCache()
+    app.extensions['tombstones'] = cache
+    return cache
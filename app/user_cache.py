@@ -0,0 +1,105 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+# Caché de usuarios del proceso para el user_loader de Flask-Login.
+# Cada save_user añade el id a una lista de invalidaciones acotada e incrementa un contador de
+# generación en la misma transacción; cada proceso lee la generación una vez por petición
+# (junto a la de eliminados) y, si ha cambiado, descarta solo los ids invalidados desde la
+# última que vio. Las entradas caducan además a los `ttl` segundos.
+GENERATION_KEY = 'users_generation'
+INVALIDATIONS_KEY = 'user_invalidations'
+MAX_INVALIDATIONS = 1000  # Si un proceso se queda más atrás, vacía su caché entera
+
+
+class UserCache:
+    """Caché LRU con caducidad de usuarios, invalidada por generación."""
+
+    def __init__(self, max_size=1000, ttl=60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # id -> (usuario, instante de caducidad)
+        self.generation = None
+        self._stats = {'hits': 0, 'misses': 0, 'invalidated': 0, 'flushes': 0}
+
+    def get(self, user_id):
+        """Copia del usuario en caché, o None si no está o ha caducado."""
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self._stats['hits'] += 1
+        # Cada petición recibe su propia copia: editar el perfil no toca la versión compartida
+        return copy.copy(entry[0])
+
+    def put(self, user):
+        with self._lock:
+            self._entries[str(user.id)] = (copy.copy(user), time.monotonic() + self.ttl)
+            self._entries.move_to_end(str(user.id))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def refresh(self, redis_client, generation):
+        """Aplicar las invalidaciones de otros procesos si la generación leída ha cambiado."""
+        generation = int(generation or 0)
+        if generation == self.generation:
+            return
+        pipe = redis_client.pipeline()
+        pipe.get(GENERATION_KEY)
+        pipe.lrange(INVALIDATIONS_KEY, 0, MAX_INVALIDATIONS - 1)
+        generation, invalidated = pipe.execute()
+        generation = int(generation or 0)
+        with self._lock:
+            if self.generation is not None and generation < self.generation:
+                # Redis ha vuelto a una copia anterior: no se sabe qué ha cambiado
+                self._flush()
+            elif self.generation is not None and generation - self.generation <= len(invalidated):
+                # La lista guarda primero lo más reciente
+                for user_id in invalidated[:generation - self.generation]:
+                    if self._entries.pop(user_id.decode('utf-8') if isinstance(user_id, bytes) else user_id, None):
+                        self._stats['invalidated'] += 1
+            else:
+                self._flush()
+            self.generation = generation
+
+    def _flush(self):
+        self._entries.clear()
+        self._stats['flushes'] += 1
+
+    @staticmethod
+    def queue_invalidate(pipe, user_id):
+        """Encolar en `pipe` la invalidación de un usuario; su último resultado es la generación nueva."""
+        pipe.lpush(INVALIDATIONS_KEY, str(user_id))
+        pipe.ltrim(INVALIDATIONS_KEY, 0, MAX_INVALIDATIONS - 1)
+        pipe.incr(GENERATION_KEY)
+
+    def applied(self, user_id, generation):
+        """Reflejar en local una invalidación ya escrita en Redis con la generación `generation`."""
+        with self._lock:
+            if self._entries.pop(str(user_id), None):
+                self._stats['invalidated'] += 1
+            if self.generation == generation - 1:
+                self.generation = generation
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        stats['generation'] = self.generation
+        stats['max_size'] = self.max_size
+        stats['ttl'] = self.ttl
+        return stats
+
+
+def init_user_cache(app):
+    """Crear la caché de usuarios del proceso a partir de la configuración de la app."""
+    cache = UserCache(max_size=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL'])
+    app.extensions['user_cache'] = cache
+    return cache
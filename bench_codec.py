@@ -0,0 +1,69 @@
+from app.models import User, Project, Task, Comment, Attachment
+from app import codec
+from datetime import datetime, timedelta
+import argparse
+import pickle
+import time
+
+# Benchmark del códec binario frente a pickle: bytes por objeto y objetos/s al codificar y decodificar
+
+def build_samples(n):
+    """Crear n objetos de cada modelo con datos representativos."""
+    samples = {}
+    samples['User'] = []
+    for i in range(n):
+        user = User(username=f'user{i}', email=f'user{i}@example.com', company='ACME')
+        user.password_hash = 'scrypt:32768:8:1$' + 'x' * 16 + '$' + 'f' * 128
+        samples['User'].append(user)
+    samples['Project'] = []
+    for i in range(n):
+        project = Project(title=f'Proyecto {i}', description='Descripción del proyecto ' * 4, owner_id=samples['User'][i].id)
+        for member in samples['User'][i + 1:i + 4]:
+            project.add_member(member.id)
+        samples['Project'].append(project)
+    samples['Task'] = [
+        Task(title=f'Tarea {i}', description='Descripción de la tarea ' * 3,
+             project_id=samples['Project'][i].id, creator_id=samples['User'][i].id,
+             assignee_id=samples['User'][i].id, due_date=datetime.utcnow() + timedelta(days=7))
+        for i in range(n)
+    ]
+    samples['Comment'] = [
+        Comment(content=f'Comentario número {i}', task_id=samples['Task'][i].id, user_id=samples['User'][i].id)
+        for i in range(n)
+    ]
+    samples['Attachment'] = [
+        Attachment(filename=f'20240101000000_doc{i}.pdf', file_path=f'/srv/taskflow/uploads/20240101000000_doc{i}.pdf',
+                   task_id=samples['Task'][i].id, user_id=samples['User'][i].id)
+        for i in range(n)
+    ]
+    return samples
+
+def measure(objects, dumps, loads):
+    """Devolver (bytes medios por objeto, objetos/s codificando, objetos/s decodificando)."""
+    start = time.perf_counter()
+    blobs = [dumps(obj) for obj in objects]
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for blob in blobs:
+        loads(blob)
+    decode_time = time.perf_counter() - start
+
+    size = sum(len(blob) for blob in blobs) / len(blobs)
+    return size, len(objects) / encode_time, len(objects) / decode_time
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparar el códec binario con pickle')
+    parser.add_argument('-n', type=int, default=20000, help='objetos por modelo')
+    args = parser.parse_args()
+
+    samples = build_samples(args.n)
+    print(f"{'Modelo':<11} {'Formato':<7} {'Bytes/obj':>10} {'Encode obj/s':>14} {'Decode obj/s':>14}")
+    for name, objects in samples.items():
+        for label, dumps, loads in (('pickle', pickle.dumps, pickle.loads),
+                                    ('binary', codec.encode, codec.decode)):
+            size, encode_rate, decode_rate = measure(objects, dumps, loads)
+            print(f"{name:<11} {label:<7} {size:>10.1f} {encode_rate:>14,.0f} {decode_rate:>14,.0f}")
+
+if __name__ == '__main__':
+    main()
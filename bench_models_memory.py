@@ -0,0 +1,67 @@
+from app.models import Task
+from datetime import datetime
+import argparse
+import gc
+import resource
+import subprocess
+import sys
+
+# Benchmark de memoria: pico de RSS al materializar N tareas con __slots__ (modelo actual)
+# frente a objetos equivalentes con __dict__ (modelo anterior)
+
+class DictTask:
+    """Réplica de Task sin __slots__, como era antes."""
+
+def build_states(n):
+    """Estados tal como llegan de Redis al deserializar."""
+    now = datetime.utcnow()
+    return [
+        {'id': f'{i:08d}-0000-0000-0000-000000000000', 'title': f'Tarea {i}', 'description': 'Descripción',
+         'status': 'todo', 'priority': 'medium', 'created_at': now, 'updated_at': now,
+         'project_id': 'p', 'creator_id': 'u', 'assignee_id': None, 'due_date': None}
+        for i in range(n)
+    ]
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def run(mode, n):
+    """Materializar n tareas en este proceso y devolver el incremento del pico de RSS (KB)."""
+    states = build_states(n)
+    gc.collect()
+    baseline = peak_rss_kb()
+    tasks = []
+    for state in states:
+        if mode == 'slots':
+            task = object.__new__(Task)
+            task.__setstate__(state)
+        else:
+            task = object.__new__(DictTask)
+            task.__dict__.update(state)
+        tasks.append(task)
+    return peak_rss_kb() - baseline
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparar el pico de RSS de Task con y sin __slots__')
+    parser.add_argument('-n', type=int, default=100000, help='número de tareas')
+    parser.add_argument('--mode', choices=('slots', 'dict'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(run(args.mode, args.n))
+        return
+
+    # Cada modo en un proceso nuevo para que el pico de RSS de uno no afecte al otro
+    results = {}
+    for mode in ('dict', 'slots'):
+        output = subprocess.check_output([sys.executable, __file__, '-n', str(args.n), '--mode', mode])
+        results[mode] = int(output.decode().strip())
+
+    for mode, delta_kb in results.items():
+        print(f"{mode:<6} +{delta_kb / 1024:8.1f} MB de pico de RSS para {args.n} tareas "
+              f"({delta_kb * 1024 / args.n:.0f} bytes/tarea)")
+    saved = results['dict'] - results['slots']
+    print(f"Ahorro: {saved / 1024:.1f} MB ({saved / results['dict'] * 100:.0f}%)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+from app.passwords import PasswordHasher
+from werkzeug.security import generate_password_hash, check_password_hash
+import argparse
+import os
+import threading
+import time
+
+# Benchmark del hash de contraseñas: logins/s (y por núcleo) verificando en línea frente al pool,
+# para elegir PASSWORD_HASH_METHOD y PASSWORD_HASH_WORKERS
+
+DEFAULT_METHODS = ('scrypt:32768:8:1', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:260000')
+
+def usable_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def measure_inline(password_hash, password, n):
+    """Logins/s verificando en el hilo que atiende la petición, uno detrás de otro."""
+    start = time.perf_counter()
+    for _ in range(n):
+        check_password_hash(password_hash, password)
+    return n / (time.perf_counter() - start)
+
+def measure_pool(hasher, password_hash, password, n, clients):
+    """Logins/s con `clients` hilos de petición verificando a la vez a través del pool."""
+    per_client = max(1, n // clients)
+
+    def client():
+        for _ in range(per_client):
+            hasher.verify(password_hash, password)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return per_client * clients / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description='Medir logins por segundo y por núcleo')
+    parser.add_argument('-n', type=int, default=50, help='logins por método')
+    parser.add_argument('--method', action='append', help='método de Werkzeug (se puede repetir)')
+    parser.add_argument('--workers', type=int, default=usable_cores(), help='hilos del pool')
+    parser.add_argument('--clients', type=int, default=16, help='peticiones simultáneas')
+    args = parser.parse_args()
+
+    cores = usable_cores()
+    password = 'correct horse battery staple'
+    print(f"{cores} núcleos, pool de {args.workers} hilos, {args.clients} peticiones simultáneas")
+    print(f"{'Método':<24} {'En línea/s':>11} {'Pool/s':>9} {'Pool/s/núcleo':>14}")
+    for method in args.method or DEFAULT_METHODS:
+        password_hash = generate_password_hash(password, method)
+        hasher = PasswordHasher(method=method, workers=args.workers, max_pending=args.clients)
+        inline_rate = measure_inline(password_hash, password, args.n)
+        pool_rate = measure_pool(hasher, password_hash, password, args.n, args.clients)
+        print(f"{method:<24} {inline_rate:>11,.1f} {pool_rate:>9,.1f} {pool_rate / min(cores, args.workers):>14,.1f}")
+
+if __name__ == '__main__':
+    main()
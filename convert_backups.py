@@ -0,0 +1,26 @@
+from app import create_app
+from app.persistence import convert_legacy_backups, restore_backups
+import sys
+
+# Importar los respaldos antiguos (backup_projects/ y backup_tasks/, un JSON por objeto)
+# al registro de respaldos, compactarlo en una instantánea y restaurar en Redis lo importado.
+# Ejecutar al actualizar, antes de arrancar la aplicación: la restauración de cada arranque
+# solo lee el registro, así que hasta la conversión no ve los respaldos antiguos.
+
+def main():
+    try:
+        app = create_app()
+        with app.app_context():
+            results = convert_legacy_backups()
+            for kind, count in results.items():
+                print(f"Respaldos de {kind} importados: {count}")
+            # La conversión borra restore_checkpoint: se repasa el registro entero
+            stats = restore_backups()
+            print(f"Restaurados en Redis: {stats['projects']} proyectos y {stats['tasks']} tareas")
+            print('Conversión de respaldos completada.')
+    except Exception as e:
+        print(f"ERROR: No se pudieron convertir los respaldos: {str(e)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
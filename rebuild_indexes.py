@@ -0,0 +1,18 @@
+from app import create_app
+from app.persistence import rebuild_indexes
+import sys
+
+def main():
+    try:
+        app = create_app()
+        with app.app_context():
+            results = rebuild_indexes()
+            for name, count in results.items():
+                print(f"Índice '{name}' reconstruido: {count} entradas")
+            print('Reconstrucción de índices completada.')
+    except Exception as e:
+        print(f"ERROR: No se pudieron reconstruir los índices: {str(e)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+from app import create_app
+from app.persistence import repair_counters
+import sys
+
+def main():
+    try:
+        app = create_app()
+        with app.app_context():
+            count = repair_counters()
+            print(f"Contadores recalculados para {count} proyectos.")
+    except Exception as e:
+        print(f"ERROR: No se pudieron recalcular los contadores: {str(e)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
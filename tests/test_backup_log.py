@@ -0,0 +1,125 @@
+import json
+import os
+
+from app.backup_log import BackupLog, _encode_record, import_legacy_backups
+
+
+def _write(path, records):
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(_encode_record(*record))
+
+
+def _dead_pid():
+    pid = 4_000_000
+    while True:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return pid
+        except PermissionError:
+            pass
+        pid += 1
+
+
+def test_latest_ts_wins_across_segments(tmp_path):
+    log = BackupLog(str(tmp_path))
+    _write(tmp_path / 'segment-1-1.log', [(300, 'projects', 'X', {'title': 'new'})])
+    _write(tmp_path / 'segment-2-1.log', [(100, 'projects', 'X', {'title': 'old'})])
+
+    assert log.read() == {('projects', 'X'): (300, {'title': 'new'})}
+
+
+def test_read_skips_records_up_to_min_ts(tmp_path):
+    log = BackupLog(str(tmp_path))
+    log.append([(100, 'projects', 'A', {'id': 'A'}), (200, 'tasks', 'B', {'id': 'B'})])
+
+    assert log.read(100) == {('tasks', 'B'): (200, {'id': 'B'})}
+    assert log.read(200) == {}
+
+
+def test_truncated_line_is_ignored(tmp_path):
+    log = BackupLog(str(tmp_path))
+    _write(tmp_path / 'segment-1-1.log', [(100, 'projects', 'A', {'id': 'A'})])
+    with open(tmp_path / 'segment-1-1.log', 'a') as f:
+        f.write('200 {"kind": "projects", "id": "A", "da')
+
+    assert log.read() == {('projects', 'A'): (100, {'id': 'A'})}
+
+
+def test_append_rotates_segment_at_max_bytes(tmp_path):
+    log = BackupLog(str(tmp_path), segment_max_bytes=1)
+    log.append([(100, 'projects', 'A', {'id': 'A'})])
+    log.append([(200, 'projects', 'B', {'id': 'B'})])
+
+    assert len(list(tmp_path.glob('segment-*.log'))) == 2
+    assert not list(tmp_path.glob('segment-*.open'))
+    assert set(log.read()) == {('projects', 'A'), ('projects', 'B')}
+
+
+def test_compact_waits_for_enough_closed_segments(tmp_path):
+    log = BackupLog(str(tmp_path), compact_segments=2)
+    _write(tmp_path / 'segment-1-1.log', [(100, 'projects', 'A', {'id': 'A'})])
+
+    assert log.compact() is False
+    assert log.compact(force=True) is True
+    assert not list(tmp_path.glob('segment-*'))
+    assert log.read() == {('projects', 'A'): (100, {'id': 'A'})}
+
+
+def test_compact_keeps_delete_shadowing_open_segment(tmp_path):
+    # Segmento abierto de un proceso vivo con una versión anterior del objeto borrado
+    log = BackupLog(str(tmp_path))
+    _write(tmp_path / f'segment-100-{os.getpid()}.open', [(100, 'projects', 'X', {'id': 'X'})])
+    _write(tmp_path / 'segment-150-1.log', [(200, 'projects', 'X', None)])
+
+    assert log.compact(force=True) is True
+
+    assert log.read() == {('projects', 'X'): (200, None)}
+    assert log.read(150) == {('projects', 'X'): (200, None)}
+
+
+def test_snapshot_keeps_delete_records(tmp_path):
+    log = BackupLog(str(tmp_path))
+    _write(tmp_path / 'segment-1-1.log', [(100, 'projects', 'X', {'id': 'X'}), (100, 'projects', 'Y', {'id': 'Y'})])
+    _write(tmp_path / 'segment-2-1.log', [(200, 'projects', 'X', None)])
+    log.compact(force=True)
+
+    # Una versión anterior que llega después (lote que no se pudo escribir a tiempo) sigue borrada
+    _write(tmp_path / 'segment-3-1.log', [(150, 'projects', 'X', {'id': 'X'})])
+    log.compact(force=True)
+
+    snapshot, = tmp_path.glob('snapshot-*.jsonl')
+    records = {json.loads(line.split(' ', 1)[1])['id']: json.loads(line.split(' ', 1)[1])['data']
+               for line in snapshot.read_text().splitlines()}
+    assert records == {'X': None, 'Y': {'id': 'Y'}}
+    assert log.read()[('projects', 'X')] == (200, None)
+
+
+def test_compact_closes_dead_process_segments(tmp_path):
+    log = BackupLog(str(tmp_path))
+    dead = tmp_path / f'segment-100-{_dead_pid()}.open'
+    live = tmp_path / f'segment-100-{os.getpid()}.open'
+    _write(dead, [(100, 'projects', 'A', {'id': 'A'})])
+    _write(live, [(100, 'projects', 'B', {'id': 'B'})])
+
+    assert log.compact(force=True) is True
+
+    assert not dead.exists() and not list(tmp_path.glob('segment-*.log'))
+    assert live.exists()
+    assert set(log.read()) == {('projects', 'A'), ('projects', 'B')}
+
+
+def test_import_legacy_backups(tmp_path):
+    legacy = tmp_path / 'backup_projects'
+    legacy.mkdir()
+    (legacy / 'A.json').write_text(json.dumps({'id': 'A', 'title': 'a'}))
+    (legacy / 'broken.txt').write_text('x')
+    log = BackupLog(str(tmp_path / 'backup_log'))
+    log.append([(10 ** 20, 'projects', 'A', None)])
+    log.close()
+
+    assert import_legacy_backups(log, {'projects': str(legacy), 'tasks': str(tmp_path / 'none')}) == \
+        {'projects': 1, 'tasks': 0}
+    # El borrado registrado después del mtime del archivo prevalece
+    assert log.read() == {('projects', 'A'): (10 ** 20, None)}
@@ -0,0 +1,68 @@
+import pytest
+import sirope
+from flask import Flask, g
+
+from app.models import Task
+from app.persistence import _dumps, _load_page_from_index
+
+fakeredis = pytest.importorskip('fakeredis')
+
+INDEX_KEY = 'project_tasks_by_update:P'
+
+
+@pytest.fixture
+def redis_client():
+    app = Flask(__name__)
+    app.config['SERIALIZER'] = 'pickle'
+    with app.app_context():
+        g.sirope = sirope.Sirope(fakeredis.FakeRedis())
+        yield g.sirope._redis
+
+
+def _tied_tasks(redis_client, count, score=1.0):
+    tasks = [Task(f't{i}', 'd', 'P', 'U') for i in range(count)]
+    for task in tasks:
+        redis_client.hset('Task', task.id, _dumps(task))
+        redis_client.zadd(INDEX_KEY, {task.id: score})
+    return tasks
+
+
+def _all_pages(cursor=None, page_size=10):
+    ids = []
+    while True:
+        page, cursor = _load_page_from_index('Task', INDEX_KEY, cursor=cursor, page_size=page_size)
+        ids += [task.id for task in page]
+        if not cursor:
+            return ids
+
+
+def test_pages_through_tied_scores(redis_client):
+    tasks = _tied_tasks(redis_client, 53)
+
+    ids = _all_pages()
+
+    assert ids == sorted((t.id for t in tasks), reverse=True)
+
+
+def test_deleted_cursor_row_keeps_tied_rows_reachable(redis_client):
+    tasks = _tied_tasks(redis_client, 53)
+    page, cursor = _load_page_from_index('Task', INDEX_KEY, page_size=10)
+    redis_client.zrem(INDEX_KEY, page[-1].id)
+    redis_client.hdel('Task', page[-1].id)
+
+    rest = _all_pages(cursor)
+
+    expected = sorted((t.id for t in tasks), reverse=True)[10:]
+    assert rest == expected
+
+
+def test_moved_cursor_row_continues_below_its_old_score(redis_client):
+    tasks = _tied_tasks(redis_client, 25)
+    lower = _tied_tasks(redis_client, 5, score=0.5)
+    page, cursor = _load_page_from_index('Task', INDEX_KEY, page_size=10)
+    redis_client.zadd(INDEX_KEY, {page[-1].id: 9.0})
+
+    rest = _all_pages(cursor)
+
+    assert rest == (sorted((t.id for t in tasks), reverse=True)[10:]
+                    + sorted((t.id for t in lower), reverse=True))